@@ -0,0 +1,287 @@
+# api_server.py
+"""Headless JSON API over the same fetch, cache and aggregation code as the UI.
+
+For dashboards and scripts that need weather data without a browser session.
+Requests go through ``weather_utils`` (so they share the response cache,
+request coalescing and API budget with the Streamlit app on this host) and
+forecasts are aggregated with ``forecast_aggregation``.
+
+    python api_server.py --port 8000
+
+Endpoints (``units`` is ``metric`` (default) or ``imperial``):
+
+- ``GET /v1/weather?city=London``: current conditions
+- ``GET /v1/forecast?city=London&days=5``: daily aggregated forecast
+- ``GET /v1/geocode?q=London&limit=5``: candidate places (gazetteer first)
+- ``GET /v1/batch?cities=London,Paris`` or ``POST /v1/batch`` with
+  ``{"cities": [...], "units": ..., "days": ...}``: weather and daily
+  forecast for many cities, fetched concurrently
+- ``GET /healthz``
+"""
+import argparse
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+
+import requests
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import config
+import weather_models
+from forecast_aggregation import aggregate_daily, aggregate_forecast, forecast_key
+from geocoding import resolve_location
+from http_client import RateLimitExceeded
+from weather_utils import QuotaExhausted, UpstreamError, get_forecast_data, get_weather_data, iter_weather_bundles
+
+UNIT_SYSTEMS = ('metric', 'imperial')
+MAX_FORECAST_DAYS = 5
+MAX_GEOCODE_RESULTS = 10
+MAX_BATCH_CITIES = 50
+
+# Daily rows are memoized per forecast content; forecasts only change when
+# they are refetched, so most requests skip aggregation entirely.
+DAILY_CACHE_SIZE = 1024
+_daily_cache = OrderedDict()
+_daily_cache_lock = threading.Lock()
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class CompactJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when it is installed."""
+
+    def render(self, content):
+        return weather_models.encode_json(content)
+
+
+def _error(status, message):
+    return CompactJSONResponse({'error': message}, status_code=status)
+
+
+def _units(value):
+    units = value or 'metric'
+    if units not in UNIT_SYSTEMS:
+        raise APIError(400, f"units must be one of {', '.join(UNIT_SYSTEMS)}")
+    return units
+
+
+def _bounded_int(value, name, default, maximum):
+    """Parse a query-string or JSON integer; JSON floats and booleans are rejected."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        try:
+            number = int(value)
+        except ValueError:
+            raise APIError(400, f"{name} must be an integer") from None
+    elif isinstance(value, int) and not isinstance(value, bool):
+        number = value
+    else:
+        raise APIError(400, f"{name} must be an integer")
+    if not 1 <= number <= maximum:
+        raise APIError(400, f"{name} must be between 1 and {maximum}")
+    return number
+
+
+def _required(params, name):
+    value = (params.get(name) or '').strip()
+    if not value:
+        raise APIError(400, f"missing '{name}' parameter")
+    return value
+
+
+def daily_records(daily):
+    """JSON-ready rows from an ``aggregate_*`` DataFrame."""
+    daily = daily.assign(
+        date=daily['date'].dt.strftime('%Y-%m-%d'),
+        max_temp=daily['max_temp'].round(2),
+        min_temp=daily['min_temp'].round(2),
+        avg_humidity=daily['avg_humidity'].round().astype(int),
+        avg_wind=daily['avg_wind'].round(1),
+    )
+    return daily.to_dict('records')
+
+
+def daily_forecasts(forecasts, days):
+    """Daily rows per city for ``{city: Forecast}``, aggregating cache misses in one pass.
+
+    The returned row lists are shared with the cache and must not be mutated.
+    """
+    keys = {city: forecast_key(forecast, days) for city, forecast in forecasts.items()}
+    results = {}
+    with _daily_cache_lock:
+        for city, key in keys.items():
+            rows = _daily_cache.get(key)
+            if rows is not None:
+                _daily_cache.move_to_end(key)
+                results[city] = rows
+    missing = {city: forecast for city, forecast in forecasts.items() if city not in results}
+    if len(missing) == 1:
+        (city, forecast), = missing.items()
+        results[city] = daily_records(aggregate_forecast(forecast, days))
+    elif missing:
+        for city in missing:
+            results[city] = []
+        for row in daily_records(aggregate_daily(missing, days)):
+            results[row.pop('city')].append(row)
+    with _daily_cache_lock:
+        for city in missing:
+            _daily_cache[keys[city]] = results[city]
+        while len(_daily_cache) > DAILY_CACHE_SIZE:
+            _daily_cache.popitem(last=False)
+    return results
+
+
+def _weather_json(weather):
+    return asdict(weather)
+
+
+def _forecast_json(forecast, days):
+    return {
+        'city': forecast.city,
+        'stale': forecast.stale,
+        'daily': daily_forecasts({forecast.city: forecast}, days)[forecast.city],
+    }
+
+
+def _describe_error(error):
+    """``(status, message)`` for an API or fetch error, or ``None`` if unexpected.
+
+    requests' messages include the URL with the API key, so those errors are
+    reported by type only.
+    """
+    if isinstance(error, APIError):
+        return error.status, str(error)
+    if isinstance(error, UpstreamError):
+        return 404 if error.status_code == 404 else 502, str(error)
+    if isinstance(error, TimeoutError):
+        return 504, str(error)
+    if isinstance(error, requests.exceptions.Timeout):
+        return 504, "OpenWeather request timed out"
+    if isinstance(error, (RateLimitExceeded, QuotaExhausted)):
+        return 503, "OpenWeather API quota exhausted; please try again shortly"
+    if isinstance(error, requests.exceptions.RequestException):
+        # Connection failures and exhausted retries
+        return 502, f"OpenWeather request failed ({type(error).__name__})"
+    if isinstance(error, ValueError):
+        # Missing API key
+        return 502, str(error)
+    return None
+
+
+def _handle(endpoint):
+    """Wrap ``endpoint`` so API, upstream and timeout errors become JSON errors."""
+    async def handler(request):
+        try:
+            return CompactJSONResponse(await endpoint(request))
+        except Exception as e:
+            described = _describe_error(e)
+            if described is None:
+                raise
+            return _error(*described)
+    return handler
+
+
+async def weather(request):
+    params = request.query_params
+    city, units = _required(params, 'city'), _units(params.get('units'))
+    return _weather_json(await run_in_threadpool(get_weather_data, city, units))
+
+
+async def forecast(request):
+    params = request.query_params
+    city, units = _required(params, 'city'), _units(params.get('units'))
+    days = _bounded_int(params.get('days'), 'days', MAX_FORECAST_DAYS, MAX_FORECAST_DAYS)
+    # Aggregation can run pandas on a cache miss; keep it off the event loop too
+    return await run_in_threadpool(lambda: _forecast_json(get_forecast_data(city, units), days))
+
+
+async def geocode(request):
+    params = request.query_params
+    query = _required(params, 'q')
+    limit = _bounded_int(params.get('limit'), 'limit', 5, MAX_GEOCODE_RESULTS)
+    return {'results': await run_in_threadpool(resolve_location, query, limit)}
+
+
+def fetch_batch(cities, units, days):
+    """Fetch and aggregate many cities; the blocking part of ``/v1/batch``."""
+    bundles = dict(iter_weather_bundles(cities, units))
+    forecasts = {city: bundle['forecast'] for city, bundle in bundles.items() if bundle['forecast'] is not None}
+    daily = daily_forecasts(forecasts, days)
+
+    results = {}
+    for city, bundle in bundles.items():
+        results[city] = {
+            'weather': _weather_json(bundle['weather']) if bundle['weather'] is not None else None,
+            'forecast': daily.get(city),
+            'stale': bundle['stale'],
+            'errors': {part: (_describe_error(error) or (500, "internal error"))[1]
+                       for part, error in bundle['errors'].items()},
+        }
+    return results
+
+
+async def batch(request):
+    if request.method == 'POST':
+        try:
+            body = weather_models.decode_json(await request.body())
+        except ValueError:
+            raise APIError(400, "request body must be JSON") from None
+        if not isinstance(body, dict):
+            raise APIError(400, "request body must be a JSON object")
+        cities = body.get('cities')
+        if not isinstance(cities, list) or not all(isinstance(city, str) for city in cities):
+            raise APIError(400, "'cities' must be a list of city names")
+        units, days = body.get('units'), body.get('days')
+    else:
+        params = request.query_params
+        cities = _required(params, 'cities').split(',')
+        units, days = params.get('units'), params.get('days')
+
+    cities = [city.strip() for city in cities if city.strip()]
+    if not cities:
+        raise APIError(400, "no cities given")
+    if len(cities) > MAX_BATCH_CITIES:
+        raise APIError(400, f"at most {MAX_BATCH_CITIES} cities per batch")
+    units = _units(units)
+    days = _bounded_int(days, 'days', MAX_FORECAST_DAYS, MAX_FORECAST_DAYS)
+    return {'results': await run_in_threadpool(fetch_batch, cities, units, days)}
+
+
+async def healthz(request):
+    return {'status': 'ok'}
+
+
+app = Starlette(routes=[
+    Route('/v1/weather', _handle(weather)),
+    Route('/v1/forecast', _handle(forecast)),
+    Route('/v1/geocode', _handle(geocode)),
+    Route('/v1/batch', _handle(batch), methods=['GET', 'POST']),
+    Route('/healthz', _handle(healthz)),
+])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Weather Wizard JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help="processes; they share the disk cache")
+    args = parser.parse_args()
+
+    # Fail fast on a missing API key (secrets, then environment)
+    config.get_api_key()
+    uvicorn.run('api_server:app', host=args.host, port=args.port, workers=args.workers,
+                log_level='warning', access_log=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,44 @@
 # app.py
 import streamlit as st
-import folium
-from streamlit_folium import folium_static
-import requests
-from datetime import datetime
-import plotly.express as px
-import pandas as pd
-from weather_utils import get_weather_data, get_forecast_data
-from ui_components import setup_page_config, render_current_weather, render_map
-import os
-from dotenv import load_dotenv
-import streamlit as st
-api_key = st.secrets["openweather"]["OPENWEATHER_API_KEY"]
+import threading
+from collections import OrderedDict
+from datetime import date
+import config
+import metrics
+from weather_utils import convert_bundle, get_weather_bundle
+from figure_cache import cached_figure
+from search_session import run_search
+from ui_components import (
+    setup_page_config, render_current_weather, render_map, render_multi_city_dashboard, parse_city_list,
+    render_metrics_panel, render_history
+)
+
+# pandas and Plotly are imported where a forecast is rendered, and Folium
+# only by the map view, so opening one mode doesn't load the others' libraries.
 
-# Load environment variables
-if os.path.exists('.streamlit/secrets.toml'):
-    load_dotenv('.streamlit/secrets.toml')
+# Daily forecast rows kept across reruns and sessions, keyed by forecast content
+FORECAST_ROWS_CACHE_SIZE = 256
+_forecast_rows = OrderedDict()
+_forecast_rows_lock = threading.Lock()
 
-OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
-assert OPENWEATHER_API_KEY, "API key must be set in .streamlit/secrets.toml"
+# Suggestions offered in the multi-city dashboard
+DASHBOARD_CITIES = [
+    "London", "Paris", "Berlin", "Madrid", "Rome", "New York", "Los Angeles",
+    "Chicago", "Toronto", "Tokyo", "Sydney", "Singapore", "Dubai", "Mumbai",
+    "São Paulo", "Cairo", "Lagos", "Karachi", "Lahore", "Istanbul"
+]
 
 def main():
+    # Stage timings of this rerun feed the optional debug panel
+    with metrics.trace() as spans:
+        with metrics.span('page'):
+            render_page()
+        render_metrics_panel(spans)
+
+def render_page():
+    # Fail fast on a missing API key (secrets, then environment)
+    config.get_api_key()
+
     # Setup page configuration and theme
     setup_page_config()
     
@@ -46,81 +64,94 @@ def main():
     with st.container():
         search_method = st.radio(
             "Choose search method:",
-            ["City Search", "Map Selection"],
+            ["City Search", "Map Selection", "Multi-City Dashboard"],
             horizontal=True,
             help="Select how you want to search for weather data"
         )
     
     if search_method == "City Search":
+        render_city_search(unit_system)
+    
+    elif search_method == "Map Selection":
+        render_map(unit_system)
+
+    else:  # Multi-City Dashboard
+        render_dashboard(unit_system)
+
+@st.fragment
+def render_city_search(unit_system):
+    """City search box and results; submitting a city reruns only this fragment."""
+    # Nothing is fetched until the search is submitted (button or Enter)
+    with st.form("city_search", border=False):
         city = st.text_input("Enter city name:", placeholder="e.g., London")
-        if city:
-            try:
-                # Get current weather data
-                weather_data = get_weather_data(city, unit_system)
-                if weather_data:
-                    render_current_weather(weather_data, unit_system)
+        st.form_submit_button("Search")
+    if city:
+        try:
+            # Fetch current weather and forecast concurrently, once per distinct
+            # query; results are metric so switching units needs no new fetch
+            with metrics.span('fetch'):
+                bundle = run_search(
+                    'city', city, get_weather_bundle, keep=lambda bundle: not bundle['errors'] and not bundle['stale']
+                )
+            bundle = convert_bundle(bundle, unit_system)
+            for error in bundle['errors'].values():
+                st.error(f"Error: {str(error)}")
+            if bundle['stale']:
+                st.warning("API quota reached — showing the most recently cached data.")
+
+            if bundle['weather']:
+                render_current_weather(bundle['weather'], unit_system)
+            if bundle['forecast']:
+                display_forecast(bundle['forecast'], unit_system)
+                render_history(city, unit_system)
                     
-                    # Get and display forecast data
-                    forecast_data = get_forecast_data(city, unit_system)
-                    if forecast_data:
-                        display_forecast(forecast_data, unit_system)
-                        
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
-    
-    else:  # Map Selection
-        render_map()
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+
+@st.fragment
+def render_dashboard(unit_system):
+    """Multi-city inputs and comparison; editing the city list reruns only this fragment."""
+    uploaded = st.file_uploader(
+        "Upload a city list:",
+        type=["txt", "csv"],
+        help="One city per line, or a CSV with a 'city' column"
+    )
+    selected = st.multiselect(
+        "Or choose cities:",
+        DASHBOARD_CITIES,
+        accept_new_options=True,
+        placeholder="Pick or type city names"
+    )
+    cities = parse_city_list(uploaded) if uploaded else selected
+    if cities:
+        render_multi_city_dashboard(cities, unit_system)
 
 def process_forecast_data(api_response):
-    """Process raw API data into daily aggregated forecast."""
-    daily_data = {}
-    
+    """Process raw API data into daily aggregated forecast.
+
+    Rows are memoized per forecast content, since City Search reruns render
+    the same cached forecast again; the returned list must not be mutated.
+    """
+    from forecast_aggregation import aggregate_forecast, forecast_key
+
     try:
-        for item in api_response['list']:
-            dt = datetime.fromtimestamp(item['dt'])
-            date = dt.strftime('%Y-%m-%d')
-            
-            if date not in daily_data:
-                daily_data[date] = {
-                    'temps': [],
-                    'humidity': [],
-                    'wind_speed': [],
-                    'weather_counts': {}
-                }
-            
-            # Aggregate metrics
-            daily_data[date]['temps'].append(item['main']['temp'])
-            daily_data[date]['humidity'].append(item['main']['humidity'])
-            daily_data[date]['wind_speed'].append(item['wind']['speed'])
-            
-            # Track weather conditions
-            weather = item['weather'][0]
-            weather_desc = weather['description']
-            if weather_desc in daily_data[date]['weather_counts']:
-                daily_data[date]['weather_counts'][weather_desc]['count'] += 1
-            else:
-                daily_data[date]['weather_counts'][weather_desc] = {
-                    'count': 1,
-                    'icon': weather['icon']
-                }
-
-        # Process aggregated data
-        processed = []
-        for date, data in daily_data.items():
-            dominant_weather = max(data['weather_counts'].items(), 
-                                 key=lambda x: x[1]['count'])
-            
-            processed.append({
-                'date': date,
-                'max_temp': max(data['temps']),
-                'min_temp': min(data['temps']),
-                'avg_humidity': sum(data['humidity']) // len(data['humidity']),
-                'avg_wind': round(sum(data['wind_speed']) / len(data['wind_speed']), 1),
-                'weather': dominant_weather[0],
-                'icon': dominant_weather[1]['icon']
-            })
-        
-        return sorted(processed, key=lambda x: x['date'])[:5]
+        key = forecast_key(api_response)
+        with _forecast_rows_lock:
+            rows = _forecast_rows.get(key)
+            if rows is not None:
+                _forecast_rows.move_to_end(key)
+                return rows
+        with metrics.span('aggregate'):
+            daily = aggregate_forecast(api_response)
+        daily['date'] = daily['date'].dt.strftime('%Y-%m-%d')
+        daily['avg_humidity'] = daily['avg_humidity'].astype(int)
+        daily['avg_wind'] = daily['avg_wind'].round(1)
+        rows = daily.to_dict('records')
+        with _forecast_rows_lock:
+            _forecast_rows[key] = rows
+            while len(_forecast_rows) > FORECAST_ROWS_CACHE_SIZE:
+                _forecast_rows.popitem(last=False)
+        return rows
     
     except Exception as e:
         st.error(f"Data processing error: {str(e)}")
@@ -133,61 +164,78 @@ def display_forecast(forecast_data, unit_system):
         if not processed:
             return
 
-        # Unit configuration
-        temp_unit = '°C' if unit_system == 'metric' else '°F'
-        wind_unit = 'm/s' if unit_system == 'metric' else 'mph'
-
-        # Create temperature chart
-        df = pd.DataFrame(processed)
-        df['date'] = pd.to_datetime(df['date']).dt.strftime('%a, %b %d')
-        
-        fig = px.line(
-            df, 
-            x='date', 
-            y=['max_temp', 'min_temp'], 
-            title=f'5-Day Temperature Forecast ({temp_unit})',
-            labels={'value': f'Temperature ({temp_unit})', 'variable': ''},
-            template='plotly_dark'
-        )
-        
-        fig.update_layout(
-            hovermode='x unified',
-            legend=dict(orientation='h', yanchor='bottom', y=1.02),
-            xaxis_title=None,
-            yaxis_title=f'Temperature ({temp_unit})',
-            plot_bgcolor='rgba(0,0,0,0)',
-            margin=dict(t=40, b=20)
-        )
-        fig.update_traces(
-            line=dict(width=2.5),
-            line_color='#FFA500',  # Orange for max temps
-            name='',
-            selector=dict(name='max_temp')
-        )
-        fig.update_traces(
-            line=dict(width=2.5),
-            line_color='#1E90FF',  # Dodger blue for min temps
-            name='',
-            selector=dict(name='min_temp')
-        )
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Daily forecast cards
-        st.subheader("Detailed Daily Forecast")
-        cols = st.columns(5)
-        for i, day in enumerate(processed):
-            with cols[i]:
-                with st.container():
-                    st.markdown(f"**{pd.to_datetime(day['date']).strftime('%a, %b %d')}**")
-                    st.image(f"https://openweathermap.org/img/wn/{day['icon']}@2x.png", width=80)
-                    st.caption(day['weather'].capitalize())
-                    st.metric("High", f"{day['max_temp']:.1f}{temp_unit}")
-                    st.metric("Low", f"{day['min_temp']:.1f}{temp_unit}")
-                    st.progress(day['avg_humidity'] / 100, text=f"💧 Humidity: {day['avg_humidity']}%")
-                    st.write(f"🌪️ Wind: {day['avg_wind']} {wind_unit}")
+        render_forecast_chart(processed, unit_system)
+        render_forecast_cards(processed, unit_system)
                     
     except Exception as e:
         st.error(f"Forecast display error: {str(e)}")
 
+def render_forecast_chart(processed, unit_system):
+    """Temperature trend chart for the aggregated daily forecast."""
+    temp_unit = '°C' if unit_system == 'metric' else '°F'
+    template = 'plotly_dark' if st.session_state.get('theme') == 'dark' else 'plotly_white'
+    fig = cached_figure(
+        'app_forecast', processed, lambda: build_forecast_figure(processed, temp_unit, template), temp_unit, template
+    )
+    with metrics.span('plotly_chart'):
+        st.plotly_chart(fig, width="stretch")
+
+def build_forecast_figure(processed, temp_unit, template):
+    """Build the 5-day temperature chart figure."""
+    import pandas as pd
+    import plotly.express as px
+
+    df = pd.DataFrame(processed)
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%a, %b %d')
+    
+    fig = px.line(
+        df, 
+        x='date', 
+        y=['max_temp', 'min_temp'], 
+        title=f'5-Day Temperature Forecast ({temp_unit})',
+        labels={'value': f'Temperature ({temp_unit})', 'variable': ''},
+        template=template
+    )
+    
+    fig.update_layout(
+        hovermode='x unified',
+        legend=dict(orientation='h', yanchor='bottom', y=1.02),
+        xaxis_title=None,
+        yaxis_title=f'Temperature ({temp_unit})',
+        plot_bgcolor='rgba(0,0,0,0)',
+        margin=dict(t=40, b=20)
+    )
+    fig.update_traces(
+        line=dict(width=2.5),
+        line_color='#FFA500',  # Orange for max temps
+        name='',
+        selector=dict(name='max_temp')
+    )
+    fig.update_traces(
+        line=dict(width=2.5),
+        line_color='#1E90FF',  # Dodger blue for min temps
+        name='',
+        selector=dict(name='min_temp')
+    )
+    return fig
+
+def render_forecast_cards(processed, unit_system):
+    """Per-day forecast cards for the aggregated daily forecast."""
+    temp_unit = '°C' if unit_system == 'metric' else '°F'
+    wind_unit = 'm/s' if unit_system == 'metric' else 'mph'
+
+    st.subheader("Detailed Daily Forecast")
+    cols = st.columns(5)
+    for i, day in enumerate(processed):
+        with cols[i]:
+            with st.container():
+                st.markdown(f"**{date.fromisoformat(day['date']).strftime('%a, %b %d')}**")
+                st.image(f"https://openweathermap.org/img/wn/{day['icon']}@2x.png", width=80)
+                st.caption(day['weather'].capitalize())
+                st.metric("High", f"{day['max_temp']:.1f}{temp_unit}")
+                st.metric("Low", f"{day['min_temp']:.1f}{temp_unit}")
+                st.progress(day['avg_humidity'] / 100, text=f"💧 Humidity: {day['avg_humidity']}%")
+                st.write(f"🌪️ Wind: {day['avg_wind']} {wind_unit}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Micro-benchmark: vectorized forecast aggregation vs. the original loops.
+
+Run from the repository root::
+
+    python benchmarks/bench_aggregation.py
+"""
+import os
+import random
+import sys
+import timeit
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast_aggregation import (  # noqa: E402
+    aggregate_columns, aggregate_daily, aggregate_forecast, forecast_columns,
+)
+from weather_models import parse_forecast  # noqa: E402
+
+CONDITIONS = [
+    ('clear sky', '01d'), ('few clouds', '02d'), ('scattered clouds', '03d'),
+    ('broken clouds', '04d'), ('light rain', '10d'), ('moderate rain', '10d'),
+]
+
+
+def make_forecast(seed, start=1_700_000_000, entries=40):
+    """Synthetic ``/forecast`` payload with 3-hourly entries."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(entries):
+        description, icon = rng.choice(CONDITIONS)
+        items.append({
+            'dt': start + i * 10800,
+            'main': {'temp': round(rng.uniform(-5, 30), 2), 'humidity': rng.randint(20, 100)},
+            'wind': {'speed': round(rng.uniform(0, 15), 2)},
+            'weather': [{'description': description, 'icon': icon}],
+        })
+    return {'list': items}
+
+
+def legacy_app_loop(api_response):
+    """The original ``app.process_forecast_data`` aggregation loop."""
+    daily_data = {}
+    for item in api_response['list']:
+        date = datetime.fromtimestamp(item['dt']).strftime('%Y-%m-%d')
+        if date not in daily_data:
+            daily_data[date] = {'temps': [], 'humidity': [], 'wind_speed': [], 'weather_counts': {}}
+        daily_data[date]['temps'].append(item['main']['temp'])
+        daily_data[date]['humidity'].append(item['main']['humidity'])
+        daily_data[date]['wind_speed'].append(item['wind']['speed'])
+        weather = item['weather'][0]
+        counts = daily_data[date]['weather_counts']
+        if weather['description'] in counts:
+            counts[weather['description']]['count'] += 1
+        else:
+            counts[weather['description']] = {'count': 1, 'icon': weather['icon']}
+
+    processed = []
+    for date, data in daily_data.items():
+        dominant = max(data['weather_counts'].items(), key=lambda x: x[1]['count'])
+        processed.append({
+            'date': date,
+            'max_temp': max(data['temps']),
+            'min_temp': min(data['temps']),
+            'avg_humidity': sum(data['humidity']) // len(data['humidity']),
+            'avg_wind': round(sum(data['wind_speed']) / len(data['wind_speed']), 1),
+            'weather': dominant[0],
+            'icon': dominant[1]['icon'],
+        })
+    return sorted(processed, key=lambda x: x['date'])[:5]
+
+
+def legacy_ui_loop(data):
+    """The original ``ui_components.process_forecast_data`` implementation."""
+    daily_data = {}
+    for item in data['list']:
+        dt = datetime.fromtimestamp(item['dt']).date()
+        if dt not in daily_data:
+            daily_data[dt] = {'temps': [], 'humidity': [], 'wind_speed': [], 'icons': []}
+        daily_data[dt]['temps'].append(item['main']['temp'])
+        daily_data[dt]['humidity'].append(item['main']['humidity'])
+        daily_data[dt]['wind_speed'].append(item['wind']['speed'])
+        daily_data[dt]['icons'].append(item['weather'][0]['icon'])
+
+    processed = []
+    for date, values in daily_data.items():
+        processed.append({
+            'date': date,
+            'max_temp': max(values['temps']),
+            'min_temp': min(values['temps']),
+            'avg_humidity': sum(values['humidity']) / len(values['humidity']),
+            'avg_wind': sum(values['wind_speed']) / len(values['wind_speed']),
+            'icon': max(set(values['icons']), key=values['icons'].count),
+        })
+    processed.sort(key=lambda x: x['date'])
+    df = pd.DataFrame(processed[:5])
+    df['date_str'] = df['date'].apply(lambda x: x.strftime('%a, %b %d'))
+    return df
+
+
+def check_equivalence(payload):
+    expected = legacy_app_loop(payload)
+    actual = aggregate_forecast(parse_forecast(payload))
+    assert [row['date'] for row in expected] == list(actual['date'].dt.strftime('%Y-%m-%d'))
+    assert [row['max_temp'] for row in expected] == list(actual['max_temp'])
+    assert [row['min_temp'] for row in expected] == list(actual['min_temp'])
+    assert [row['weather'] for row in expected] == list(actual['weather'])
+    assert [row['icon'] for row in expected] == list(actual['icon'])
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<52} {seconds * 1e6:>10.1f} µs")
+
+
+def main():
+    single = make_forecast(0)
+    check_equivalence(single)
+
+    print("Single city (40 entries)")
+    bench("  legacy app loop", lambda: legacy_app_loop(single), 500)
+    bench("  legacy ui loop", lambda: legacy_ui_loop(single), 500)
+    parsed = parse_forecast(single)
+    bench("  parse_forecast (once per fetch, then cached)", lambda: parse_forecast(single), 500)
+    bench("  aggregate_forecast", lambda: aggregate_forecast(parsed), 500)
+    bench("  forecast_columns + aggregate_columns (NumPy core)",
+          lambda: aggregate_columns(forecast_columns({None: parsed}), None), 500)
+    import app
+    app.process_forecast_data(parsed)
+    bench("  app.process_forecast_data (memoized rerun)", lambda: app.process_forecast_data(parsed), 500)
+
+    for n_cities in (10, 100):
+        forecasts = {f"city-{i}": make_forecast(i) for i in range(n_cities)}
+        parsed = {city: parse_forecast(payload) for city, payload in forecasts.items()}
+        print(f"\n{n_cities} cities ({n_cities * 40} entries)")
+        bench("  legacy app loop, once per city",
+              lambda: [legacy_app_loop(f) for f in forecasts.values()], 20)
+        bench("  legacy ui loop, once per city",
+              lambda: [legacy_ui_loop(f) for f in forecasts.values()], 20)
+        bench("  aggregate_daily, single batched pass", lambda: aggregate_daily(parsed), 20)
+
+
+if __name__ == '__main__':
+    main()
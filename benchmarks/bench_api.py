@@ -0,0 +1,127 @@
+"""Requests per second of the headless JSON API (``api_server.py``).
+
+Starts the stub upstream in this process and the API server in a
+subprocess pointed at it, then drives each scenario for ``--duration``
+seconds from ``--clients`` threads with keep-alive connections:
+
+- ``weather`` / ``forecast``: one hot city, served from the response cache
+- ``batch``: ``/v1/batch`` for 10 cached cities
+- ``weather-cold``: a new city per request, so every request goes upstream
+
+Reports req/s, p50/p99 latency and upstream calls per scenario. The client
+threads share one interpreter, so on small machines they, not the server,
+can be the limit::
+
+    python benchmarks/bench_api.py --clients 16 --duration 5 --workers 2
+"""
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from load_test import percentiles  # noqa: E402
+from stub_server import start_stub_server  # noqa: E402
+
+BATCH_CITIES = ','.join(f"city-{i}" for i in range(10))
+
+
+def scenarios():
+    counter = itertools.count()
+    return {
+        'weather': lambda: '/v1/weather?city=London',
+        'forecast': lambda: '/v1/forecast?city=London',
+        'batch': lambda: f'/v1/batch?cities={BATCH_CITIES}',
+        'weather-cold': lambda: f'/v1/weather?city=cold-{next(counter)}',
+    }
+
+
+def start_api(port, workers, stub_url):
+    env = {
+        **os.environ,
+        'OPENWEATHER_API_ROOT': stub_url,
+        'OPENWEATHER_API_KEY': 'benchmark',
+        'WEATHER_CACHE_PATH': '',
+        'WEATHER_HISTORY_PATH': '',
+        'OPENWEATHER_CALLS_PER_MINUTE': str(10 ** 9),
+        'OPENWEATHER_CALLS_PER_DAY': str(10 ** 9),
+    }
+    process = subprocess.Popen(
+        [sys.executable, 'api_server.py', '--port', str(port), '--workers', str(workers)], cwd=ROOT, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/healthz", timeout=1).ok:
+                return process
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("API server did not start")
+
+
+def run(base, path, clients, duration):
+    latencies, failures = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        samples, failed = [], 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            failed += session.get(base + path()).status_code != 200
+            samples.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(samples)
+            failures[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failures[0], time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument('--workers', type=int, default=1, help="API server processes")
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--latency', type=float, default=0.05, help="stub upstream latency")
+    args = parser.parse_args()
+
+    stub = start_stub_server(args.latency)
+    api = start_api(args.port, args.workers, stub.url)
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        # Warm the cache for the hot scenarios
+        for path in ('/v1/weather?city=London', '/v1/forecast?city=London', f'/v1/batch?cities={BATCH_CITIES}'):
+            for _ in range(args.workers * 2):
+                requests.get(base + path)
+
+        print(f"{args.clients} clients, {args.workers} worker(s), stub latency {args.latency * 1e3:.0f} ms")
+        print(f"  {'scenario':<13} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7} {'upstream':>9}")
+        for name, path in scenarios().items():
+            stub.calls.clear()
+            latencies, failed, wall = run(base, path, args.clients, args.duration)
+            p50, _, p99 = percentiles(latencies)
+            print(f"  {name:<13} {len(latencies) / wall:8.0f} {p50 * 1e3:8.2f} {p99 * 1e3:8.2f} "
+                  f"{failed:7d} {sum(stub.calls.values()):9d}")
+    finally:
+        api.terminate()
+        api.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""End-to-end rerun timings of ``app.main`` with Streamlit's headless AppTest.
+
+For each search mode, measures the wall time of a rerun that has to fetch
+new data (cold: a city not seen before) and of a rerun repeating the same
+input (warm: every cache hit), against the stub upstream with injected
+latency. AppTest executes the whole script, as a full page rerun does.
+
+    python benchmarks/bench_e2e.py
+"""
+import itertools
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_server import start_stub_server  # noqa: E402
+
+REPEATS = 5
+STUB_LATENCY = 0.02
+DASHBOARD_SIZE = 5
+
+
+def timed_run(element):
+    start = time.perf_counter()
+    at = element.run()
+    elapsed = time.perf_counter() - start
+    assert not at.exception, at.exception
+    return elapsed
+
+
+def main():
+    stub = start_stub_server(latency=STUB_LATENCY)
+    os.environ['OPENWEATHER_API_ROOT'] = stub.url
+    os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+    os.environ['WEATHER_CACHE_PATH'] = ''
+    os.environ['WEATHER_HISTORY_PATH'] = ''
+    os.environ['WEATHER_REFRESH_BUDGET_SHARE'] = '0'
+    os.chdir(ROOT)
+
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    print(f"First page load (imports, empty City Search): {(time.perf_counter() - start) * 1e3:.0f} ms")
+    fresh = (f"city-{i}" for i in itertools.count())
+
+    def city_search(query):
+        at.text_input[0].input(query)
+        return next(button for button in at.button if button.label == "Search").click()
+
+    def dashboard(cities):
+        return at.multiselect[0].set_value(cities)
+
+    scenarios = [
+        ("City Search", city_search, lambda: next(fresh)),
+        ("Map Selection", city_search, lambda: next(fresh)),
+        ("Multi-City Dashboard", dashboard, lambda: [next(fresh) for _ in range(DASHBOARD_SIZE)]),
+    ]
+
+    print(f"Median rerun wall time over {REPEATS} runs, stub latency {STUB_LATENCY * 1e3:.0f} ms")
+    for mode, interact, new_input in scenarios:
+        at.radio[0].set_value(mode).run()
+        cold, warm = [], []
+        for _ in range(REPEATS):
+            value = new_input()
+            cold.append(timed_run(interact(value)))
+            warm.append(timed_run(at))
+        calls = sum(stub.calls.values())
+        print(f"  {mode:<22} cold {statistics.median(cold) * 1e3:7.1f} ms   "
+              f"warm {statistics.median(warm) * 1e3:7.1f} ms   (upstream calls so far: {calls})")
+
+
+if __name__ == '__main__':
+    main()
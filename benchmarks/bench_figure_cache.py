@@ -0,0 +1,56 @@
+"""Per-render cost of the forecast chart: rebuilt vs. content-hash cache hit.
+
+Times what a rerun spends producing the temperature chart before handing it
+to Streamlit: building the figure with pandas + Plotly Express every time,
+versus hashing the daily data and reusing the cached figure. The final
+``to_json`` column is the serialization ``st.plotly_chart`` does either way.
+
+    python benchmarks/bench_figure_cache.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly.io as pio  # noqa: E402
+
+from figure_cache import cached_figure, get_figure_cache_stats  # noqa: E402
+
+REPEATS = 200
+
+DAILY = [
+    {'date': f'2024-01-0{day}', 'max_temp': 10.0 + day, 'min_temp': 2.0 + day / 2,
+     'avg_humidity': 70 + day, 'avg_wind': 3.5, 'weather': 'light rain', 'icon': '10d'}
+    for day in range(1, 6)
+]
+
+
+def median_ms(fn):
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+def main():
+    from app import build_forecast_figure
+
+    build = median_ms(lambda: build_forecast_figure(DAILY, '°C', 'plotly_white'))
+    cached = median_ms(lambda: cached_figure(
+        'app_forecast', DAILY, lambda: build_forecast_figure(DAILY, '°C', 'plotly_white'), '°C', 'plotly_white'))
+    fig = build_forecast_figure(DAILY, '°C', 'plotly_white')
+    serialize = median_ms(lambda: pio.to_json(fig, validate=False))
+
+    print(f"Median over {REPEATS} renders of a 5-day forecast chart")
+    print(f"  rebuild (pandas + px)  {build:7.2f} ms")
+    print(f"  cache hit (hash + LRU) {cached:7.2f} ms   ({build / cached:5.0f}x)")
+    print(f"  to_json (both paths)   {serialize:7.2f} ms")
+    print(f"  cache stats            {get_figure_cache_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark: gazetteer-first geocoding vs. remote-only lookups.
+
+Runs a few thousand location queries (known names, ``"City, CC"`` forms and
+unknown places) against a local stub upstream and reports local hit rate and
+lookup/autocomplete latency. Uses ``GAZETTEER_PATH`` if it points at a real
+GeoNames dump, otherwise generates a synthetic one.
+
+    python benchmarks/bench_geocoding.py
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import start_stub_server  # noqa: E402
+
+QUERIES = 3000
+STUB_LATENCY = 0.005
+SYLLABLES = ['lon', 'par', 'ber', 'ma', 'dri', 'ro', 'vi', 'en', 'na', 'to', 'ky', 'os', 'lo', 'ca', 'ir', 'del']
+COUNTRIES = ['GB', 'FR', 'DE', 'ES', 'IT', 'US', 'JP', 'IN', 'NO', 'CA']
+
+
+def write_synthetic_gazetteer(path, count=5000, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+            fields = [''] * 19
+            fields[0] = str(i)
+            fields[1] = fields[2] = name
+            fields[4] = f"{rng.uniform(-60, 70):.4f}"
+            fields[5] = f"{rng.uniform(-180, 180):.4f}"
+            fields[8] = rng.choice(COUNTRIES)
+            fields[10] = '01'
+            fields[14] = str(int(rng.paretovariate(1.2) * 15000))
+            f.write('\t'.join(fields) + '\n')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    stub = start_stub_server(latency=STUB_LATENCY)
+    os.environ['OPENWEATHER_API_ROOT'] = stub.url
+    os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+    os.environ['WEATHER_CACHE_PATH'] = ''
+    os.environ['WEATHER_HISTORY_PATH'] = ''
+    os.environ['OPENWEATHER_CALLS_PER_MINUTE'] = str(10 ** 9)
+    os.environ['OPENWEATHER_CALLS_PER_DAY'] = str(10 ** 9)
+    if not os.path.exists(os.environ.get('GAZETTEER_PATH', '')):
+        path = os.path.join(tempfile.mkdtemp(), 'cities.txt')
+        write_synthetic_gazetteer(path)
+        os.environ['GAZETTEER_PATH'] = path
+
+    import geocoding
+    import weather_utils
+
+    start = time.perf_counter()
+    gazetteer = geocoding.get_gazetteer()
+    print(f"Gazetteer: {len(gazetteer)} index entries loaded in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    rng = random.Random(1)
+    names = gazetteer._keys
+    queries = []
+    for _ in range(QUERIES):
+        roll = rng.random()
+        if roll < 0.6:
+            queries.append(rng.choice(names).title())
+        elif roll < 0.8:
+            queries.append(f"{rng.choice(names).title()}, {rng.choice(COUNTRIES)}")
+        else:
+            queries.append(f"Nowhere {rng.randint(0, 500)}")
+
+    remote_only = []
+    for query in queries[:300]:
+        start = time.perf_counter()
+        weather_utils._request_openweather("geo/1.0/direct", {'q': query, 'limit': 5}, query)
+        remote_only.append(time.perf_counter() - start)
+
+    resolved = []
+    for query in queries:
+        start = time.perf_counter()
+        geocoding.resolve_location(query)
+        resolved.append(time.perf_counter() - start)
+
+    suggest = []
+    for query in queries:
+        prefix = query[:rng.randint(1, 4)]
+        start = time.perf_counter()
+        geocoding.suggest_locations(prefix)
+        suggest.append(time.perf_counter() - start)
+
+    stats = geocoding.get_geocoding_stats()
+    print(f"Queries: {QUERIES} (stub upstream latency {STUB_LATENCY * 1e3:.0f} ms)")
+    print(f"Local hit rate: {stats['local_hit_rate']:.1%}  "
+          f"remote lookups: {stats['remote_lookups']}  "
+          f"upstream geo calls: {stub.calls.get('/geo/1.0/direct', 0) - len(remote_only)}")
+    for label, samples in (("remote only (uncached)", remote_only),
+                           ("resolve_location", resolved),
+                           ("suggest_locations", suggest)):
+        print(f"  {label:<24} mean {statistics.mean(samples) * 1e6:9.1f} µs   "
+              f"p50 {percentile(samples, 50) * 1e6:9.1f} µs   p99 {percentile(samples, 99) * 1e6:9.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""History store: append cost, dedup and range-query latency.
+
+Simulates ``--days`` of history for one city: a 40-step forecast every
+3-hour model run (each fetched twice, so half the appends are duplicates)
+and an observation every 10 minutes. Then times the 1/7/30-day range
+queries the trend chart makes, cold (a fresh store reading every segment
+file) and warm, plus picking the chart series from the result.
+
+    python benchmarks/bench_history.py [--days 30]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import HISTORY_DTYPE, HistoryStore, latest_per_dt  # noqa: E402
+
+START = 1_700_000_000 // 86400 * 86400
+RUN_INTERVAL = 3 * 3600
+OBSERVATION_INTERVAL = 600
+
+
+def forecast(issued_at, rng):
+    rows = np.zeros(40, dtype=HISTORY_DTYPE)
+    rows['dt'] = issued_at // RUN_INTERVAL * RUN_INTERVAL + RUN_INTERVAL * np.arange(1, 41)
+    rows['issued_at'] = issued_at
+    rows['temp'] = 12 + 6 * np.sin(rows['dt'] / 86400 * 2 * np.pi) + rng.normal(0, 1, 40)
+    rows['humidity'] = 70
+    rows['wind_speed'] = 4.2
+    rows['description'] = b'broken clouds'
+    rows['icon'] = b'04d'
+    return rows
+
+
+def observation(dt, rng):
+    rows = np.zeros(1, dtype=HISTORY_DTYPE)
+    rows['dt'] = rows['issued_at'] = dt
+    rows['temp'] = 12 + 6 * np.sin(dt / 86400 * 2 * np.pi) + rng.normal(0, 0.5)
+    rows['humidity'] = 70
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    root = tempfile.mkdtemp(prefix='bench-history-')
+    store = HistoryStore(root)
+    end = START + args.days * 86400
+    try:
+        appends = []
+        for run in range(START, end, RUN_INTERVAL):
+            rows = forecast(run + 900, rng)
+            for _ in range(2):
+                began = time.perf_counter()
+                store.append('london', 'forecast', rows)
+                appends.append(time.perf_counter() - began)
+            for dt in range(run, run + RUN_INTERVAL, OBSERVATION_INTERVAL):
+                began = time.perf_counter()
+                store.append('london', 'observed', observation(dt, rng))
+                appends.append(time.perf_counter() - began)
+
+        files = sum(len(names) for _, _, names in os.walk(root))
+        size = sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(root) for name in names)
+        print(f"{len(appends)} appends, median {np.median(appends) * 1e3:.2f} ms, p99 "
+              f"{np.percentile(appends, 99) * 1e3:.2f} ms; stats {store.stats}")
+        print(f"on disk: {files} segment files, {size / 1024:.0f} KB")
+
+        for days in (1, 7, args.days):
+            start = end - days * 86400
+            began = time.perf_counter()
+            HistoryStore(root).query('london', 'forecast', start, end)
+            cold = time.perf_counter() - began
+            number = 20
+            warm = timeit.timeit(lambda: store.query('london', 'forecast', start, end), number=number) / number
+            observed = store.query('london', 'observed', start, end)
+            forecasts = store.query('london', 'forecast', start, end)
+            series = timeit.timeit(lambda: (latest_per_dt(forecasts), latest_per_dt(forecasts, 86400)),
+                                   number=number) / number
+            print(f"{days:>2}-day range: {len(forecasts)} forecast + {len(observed)} observed rows, "
+                  f"query cold {cold * 1e3:.2f} ms / warm {warm * 1e3:.2f} ms, "
+                  f"latest-per-time {series * 1e3:.2f} ms")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
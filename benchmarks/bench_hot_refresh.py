@@ -0,0 +1,94 @@
+"""How often users wait on the upstream, with and without hot-key refresh.
+
+Simulated users request cities with a Zipf-like popularity skew against a
+stub upstream, through a ``ResponseCache`` with short TTLs (and no stale
+window) so expiries happen many times during the run. A request "waits"
+when it misses the cache and has to make the upstream round trip itself;
+the refresher tracks the ``TOP_N`` most popular cities.
+
+    python benchmarks/bench_hot_refresh.py
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import start_stub_server  # noqa: E402
+
+CITIES = 50
+USERS = 4
+DURATION = 10
+TTL = 2.0
+STUB_LATENCY = 0.05
+THINK_TIME = 0.01
+TOP_N = 10
+
+
+def run(stub, refresher):
+    import http_client
+    from refresh_scheduler import RefreshScheduler
+    from response_cache import ResponseCache
+
+    cache = ResponseCache(max_entries=CITIES, stale_ttl=0)
+
+    def fetch(city):
+        return http_client.get(f"{stub.url}/data/2.5/weather", params={'q': city}).json()
+
+    scheduler = None
+    if refresher:
+        scheduler = RefreshScheduler(
+            cache, lambda key: cache.put(key, fetch(key[1]), TTL), ttls={'weather': TTL},
+            top_n=TOP_N, lead_time=0.5, interval=0.1, half_life=5, per_minute=10 ** 6, per_day=10 ** 9,
+        )
+
+    weights = [1 / rank for rank in range(1, CITIES + 1)]
+    # [requests, waits] for all cities and for the TOP_N most popular
+    counts = {'all': [0, 0], 'top': [0, 0]}
+    lock = threading.Lock()
+    deadline = time.monotonic() + DURATION
+
+    def user(seed):
+        rng = random.Random(seed)
+        while time.monotonic() < deadline:
+            rank = rng.choices(range(CITIES), weights)[0]
+            city = f"city-{rank}"
+            key = ('weather', city)
+            if scheduler is not None:
+                scheduler.record(key)
+            missed = cache.get(key) is None
+            cache.get_or_fetch(key, lambda: fetch(city), TTL)
+            with lock:
+                for group in ('all', 'top') if rank < TOP_N else ('all',):
+                    counts[group][0] += 1
+                    counts[group][1] += missed
+            time.sleep(THINK_TIME)
+
+    threads = [threading.Thread(target=user, args=(seed,)) for seed in range(USERS)]
+    calls_before = sum(stub.calls.values())
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if scheduler is not None:
+        scheduler.close()
+    return counts, sum(stub.calls.values()) - calls_before
+
+
+def main():
+    stub = start_stub_server(latency=STUB_LATENCY)
+    os.environ['OPENWEATHER_CALLS_PER_MINUTE'] = str(10 ** 9)
+    os.environ['OPENWEATHER_CALLS_PER_DAY'] = str(10 ** 9)
+
+    print(f"{USERS} users, {CITIES} cities (Zipf), TTL {TTL:.0f} s, {DURATION} s per run")
+    for label, refresher in (("cache only", False), ("hot-key refresh", True)):
+        counts, upstream = run(stub, refresher)
+        (requests, waits), (top_requests, top_waits) = counts['all'], counts['top']
+        print(f"  {label:<16} {requests:6d} requests   waited {waits / requests:6.1%}   "
+              f"top {TOP_N} cities waited {top_waits / top_requests:6.1%}   upstream calls {upstream}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Cold-start import cost per app mode, measured with ``python -X importtime``.
+
+Each mode runs in a fresh interpreter that imports ``app`` plus the modules
+that mode loads on first use, and sums the cumulative time of the top-level
+imports. "all libraries" is what every cold start paid when the heavy
+libraries were imported eagerly.
+
+    python benchmarks/bench_imports.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEATS = 5
+
+FORECAST = ['forecast_aggregation', 'pandas', 'plotly.express']
+MAP = ['folium', 'folium.plugins']
+
+MODES = {
+    'app only': [],
+    'City Search': FORECAST,
+    'Map Selection': MAP,
+    'Multi-City Dashboard': FORECAST,
+    'all libraries': FORECAST + MAP,
+}
+
+
+def import_time(modules):
+    """Total cumulative import time in seconds for ``app`` plus ``modules``."""
+    code = '; '.join(f"import {name}" for name in ['app'] + modules)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Only top-level entries; nested ones are included in their parent
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+    return total / 1e6
+
+
+def main():
+    print(f"Median cold-start import time over {REPEATS} fresh interpreters")
+    for mode, modules in MODES.items():
+        samples = [import_time(modules) for _ in range(REPEATS)]
+        print(f"  {mode:<22} {statistics.median(samples) * 1e3:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
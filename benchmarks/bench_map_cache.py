@@ -0,0 +1,34 @@
+"""Folium map build + serialization vs. memoized HTML hit.
+
+    python benchmarks/bench_map_cache.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ui_components import build_map_html  # noqa: E402
+
+MARKERS = tuple(
+    (51.5 + i * 0.05, -0.12 + i * 0.05, f"Place {i}, GB<br>12.3°C, light rain", "12.3°C, light rain")
+    for i in range(5)
+)
+
+
+def main():
+    args = ((51.5074, -0.1278), 10, MARKERS, 'OpenStreetMap')
+    build = min(timeit.repeat(lambda: build_map_html.__wrapped__(*args), number=20, repeat=5)) / 20
+    build_map_html.cache_clear()
+    build_map_html(*args)
+    hit = min(timeit.repeat(lambda: build_map_html(*args), number=10000, repeat=5)) / 10000
+
+    print("Map with 5 markers + Fullscreen/MousePosition/Draw plugins")
+    print(f"  build + render     {build * 1e3:10.3f} ms")
+    print(f"  cache hit          {hit * 1e3:10.4f} ms   ({build / hit:,.0f}x faster)")
+    print(f"  HTML size          {len(build_map_html(*args)) / 1024:10.1f} KiB")
+    print(f"  cache info         {build_map_html.cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
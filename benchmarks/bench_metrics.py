@@ -0,0 +1,52 @@
+"""Cost of the instrumentation hooks with metrics disabled and enabled.
+
+A full page rerun records about ten spans, so the per-span cost times ten
+is the overhead added to each rerun.
+
+    python benchmarks/bench_metrics.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics  # noqa: E402
+
+NUMBER = 200_000
+
+
+def per_call_ns(statement):
+    return min(timeit.repeat(statement, number=NUMBER, repeat=5)) / NUMBER * 1e9
+
+
+def empty_span():
+    with metrics.span('bench'):
+        pass
+
+
+def labelled_span():
+    with metrics.span('bench', endpoint='/data/2.5/weather'):
+        pass
+
+
+def bare_block():
+    pass
+
+
+def main():
+    baseline = per_call_ns(bare_block)
+    print(f"Per call, {NUMBER:,} iterations (bare function call: {baseline:.0f} ns)")
+    for enabled in (False, True):
+        metrics.ENABLED = enabled
+        label = "enabled " if enabled else "disabled"
+        span = per_call_ns(empty_span) - baseline
+        labelled = per_call_ns(labelled_span) - baseline
+        observe = per_call_ns(lambda: metrics.observe('bench', 0.001)) - baseline
+        print(f"  {label}  span {span:6.0f} ns   labelled span {labelled:6.0f} ns   observe {observe:6.0f} ns")
+    print(f"  export of {len(metrics.export_prometheus().splitlines())} lines: "
+          f"{min(timeit.repeat(metrics.export_prometheus, number=100, repeat=3)) / 100 * 1e6:.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Micro-benchmarks for the forecast processing and fetch hot paths.
+
+Covers both ``process_forecast_data`` implementations (``app`` and
+``ui_components``) on the recorded forecast fixture, and the
+``weather_utils`` fetch functions against the stub server (no injected
+latency, so the numbers are client-side overhead): cold misses that go
+upstream and warm cache hits.
+
+    python benchmarks/bench_micro.py
+"""
+import itertools
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_server import load_fixture, start_stub_server  # noqa: E402
+
+NUMBER = 200
+
+
+def bench(label, func, number=NUMBER):
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {label:<48} {seconds * 1e6:10.1f} µs")
+
+
+def main():
+    stub = start_stub_server()
+    os.environ['OPENWEATHER_API_ROOT'] = stub.url
+    os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+    os.environ['WEATHER_CACHE_PATH'] = ''
+    os.environ['WEATHER_HISTORY_PATH'] = ''
+    os.environ['WEATHER_REFRESH_BUDGET_SHARE'] = '0'
+    os.environ['OPENWEATHER_CALLS_PER_MINUTE'] = str(10 ** 9)
+    os.environ['OPENWEATHER_CALLS_PER_DAY'] = str(10 ** 9)
+    os.chdir(ROOT)
+
+    import app
+    import ui_components
+    import weather_utils
+    from unit_conversion import convert_forecast
+    from weather_models import parse_forecast
+
+    forecast = parse_forecast(load_fixture('forecast'))
+    imperial = convert_forecast(forecast, 'imperial')
+
+    print("process_forecast_data (40-step forecast fixture)")
+    bench("app.process_forecast_data", lambda: app.process_forecast_data(forecast))
+    bench("ui_components.process_forecast_data (metric)", lambda: ui_components.process_forecast_data(forecast, 'metric'))
+    bench("ui_components.process_forecast_data (imperial)",
+          lambda: ui_components.process_forecast_data(imperial, 'imperial'))
+
+    # A fresh city per call forces a real upstream round trip
+    fresh = (f"city-{i}" for i in itertools.count())
+    print("\nFetch functions, cold (cache miss → stub upstream)")
+    bench("get_weather_data", lambda: weather_utils.get_weather_data(next(fresh)), 50)
+    bench("get_forecast_data", lambda: weather_utils.get_forecast_data(next(fresh)), 50)
+    bench("get_weather_bundle", lambda: weather_utils.get_weather_bundle(next(fresh)), 50)
+    bench("geocode_location", lambda: weather_utils.geocode_location(next(fresh)), 50)
+
+    print("\nFetch functions, warm (cache hit)")
+    bench("get_weather_data", lambda: weather_utils.get_weather_data('London'), 2000)
+    bench("get_forecast_data (imperial conversion)",
+          lambda: weather_utils.get_forecast_data('London', 'imperial'), 2000)
+    bench("get_weather_bundle", lambda: weather_utils.get_weather_bundle('London'), 2000)
+    bench("get_weather_by_coords", lambda: weather_utils.get_weather_by_coords(51.5074, -0.1278), 2000)
+
+
+if __name__ == '__main__':
+    main()
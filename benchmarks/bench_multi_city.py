@@ -0,0 +1,56 @@
+"""Throughput of multi-city batch fetching against a stub upstream.
+
+Fetches current weather + forecast for N cities through
+``weather_utils.iter_weather_bundles`` at several worker-pool sizes, with
+injected upstream latency, and reports cities/s and time to the first row.
+
+    python benchmarks/bench_multi_city.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import start_stub_server  # noqa: E402
+
+CITIES = 100
+STUB_LATENCY = 0.05
+WORKER_COUNTS = (1, 4, 8, 16, 32)
+
+
+def main():
+    stub = start_stub_server(latency=STUB_LATENCY)
+    os.environ['OPENWEATHER_API_ROOT'] = stub.url
+    os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+    os.environ['WEATHER_CACHE_PATH'] = ''
+    os.environ['WEATHER_HISTORY_PATH'] = ''
+    os.environ['OPENWEATHER_CALLS_PER_MINUTE'] = str(10 ** 9)
+    os.environ['OPENWEATHER_CALLS_PER_DAY'] = str(10 ** 9)
+
+    import http_client
+    import weather_utils
+    from forecast_aggregation import aggregate_daily
+
+    # Let the connection pool grow with the worker count under test
+    http_client.POOL_SIZE = max(WORKER_COUNTS)
+
+    print(f"{CITIES} cities, stub latency {STUB_LATENCY * 1e3:.0f} ms per request")
+    for run, workers in enumerate(WORKER_COUNTS):
+        cities = [f"city-{run}-{i}" for i in range(CITIES)]
+        forecasts = {}
+        start = time.perf_counter()
+        first_row = None
+        for city, bundle in weather_utils.iter_weather_bundles(cities, max_workers=workers):
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            forecasts[city] = bundle['forecast']
+        fetched = time.perf_counter() - start
+        aggregate_daily(forecasts)
+        total = time.perf_counter() - start
+        print(f"  workers={workers:<3} fetch {fetched:6.2f} s   first row {first_row * 1e3:7.1f} ms   "
+              f"aggregate {(total - fetched) * 1e3:5.1f} ms   {CITIES / total:7.1f} cities/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Bytes held per cached city: raw OpenWeather JSON vs. parsed compact models.
+
+Builds a full-shape ``/weather`` and 40-step ``/forecast`` response (every
+field OpenWeather documents, not just the ones the app reads) and reports
+the in-memory footprint (recursive ``sys.getsizeof``) and the disk-cache
+row size for the raw dicts and for ``weather_models`` objects.
+
+    python benchmarks/bench_payload_size.py
+"""
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import weather_models  # noqa: E402
+
+START = 1_700_000_000
+
+
+def weather_payload():
+    return {
+        'coord': {'lon': -0.1257, 'lat': 51.5085},
+        'weather': [{'id': 803, 'main': 'Clouds', 'description': 'broken clouds', 'icon': '04d'}],
+        'base': 'stations',
+        'main': {'temp': 12.31, 'feels_like': 11.62, 'temp_min': 11.05, 'temp_max': 13.4, 'pressure': 1012,
+                 'humidity': 79, 'sea_level': 1012, 'grnd_level': 1008},
+        'visibility': 10000,
+        'wind': {'speed': 4.63, 'deg': 240, 'gust': 8.75},
+        'clouds': {'all': 75},
+        'dt': START,
+        'sys': {'type': 2, 'id': 2075535, 'country': 'GB', 'sunrise': START - 20000, 'sunset': START + 9000},
+        'timezone': 0,
+        'id': 2643743,
+        'name': 'London',
+        'cod': 200,
+    }
+
+
+def forecast_payload(entries=40):
+    conditions = [(500, 'Rain', 'light rain', '10d'), (803, 'Clouds', 'broken clouds', '04d'),
+                  (800, 'Clear', 'clear sky', '01n')]
+    items = []
+    for i in range(entries):
+        code, main, description, icon = conditions[i % len(conditions)]
+        dt = START + i * 10800
+        items.append({
+            'dt': dt,
+            'main': {'temp': 10.5 + i % 8 * 0.73, 'feels_like': 9.8 + i % 8 * 0.7, 'temp_min': 10.1 + i % 5,
+                     'temp_max': 11.2 + i % 5, 'pressure': 1010 + i % 7, 'sea_level': 1010 + i % 7,
+                     'grnd_level': 1006 + i % 7, 'humidity': 60 + i % 30, 'temp_kf': 0.41},
+            'weather': [{'id': code, 'main': main, 'description': description, 'icon': icon}],
+            'clouds': {'all': 20 + i % 80},
+            'wind': {'speed': 3.1 + i % 6 * 0.57, 'deg': 180 + i % 90, 'gust': 6.2 + i % 4},
+            'visibility': 10000,
+            'pop': round(i % 10 / 10, 2),
+            'rain': {'3h': 0.31},
+            'sys': {'pod': 'd' if i % 8 < 4 else 'n'},
+            'dt_txt': f"2023-11-{14 + i // 8:02d} {i % 8 * 3:02d}:00:00",
+        })
+    return {
+        'cod': '200', 'message': 0, 'cnt': entries, 'list': items,
+        'city': {'id': 2643743, 'name': 'London', 'coord': {'lat': 51.5085, 'lon': -0.1257}, 'country': 'GB',
+                 'population': 1000000, 'timezone': 0, 'sunrise': START - 20000, 'sunset': START + 9000},
+    }
+
+
+def deep_size(obj, seen=None):
+    """Recursive ``sys.getsizeof`` over containers, slots and array buffers."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is not None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_size(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+
+
+def main():
+    weather, forecast = weather_payload(), forecast_payload()
+    raw_text = {'weather': json.dumps(weather), 'forecast': json.dumps(forecast)}
+    parsed = {
+        'weather': weather_models.parse_weather(weather),
+        'forecast': weather_models.parse_forecast(forecast),
+    }
+    raw = {'weather': weather, 'forecast': forecast}
+
+    print("Bytes per cached city (current weather + 40-step forecast)")
+    print(f"  {'':<10} {'raw memory':>12} {'compact memory':>15} {'raw disk':>10} {'compact disk':>13}")
+    totals = [0, 0, 0, 0]
+    for part in ('weather', 'forecast'):
+        row = [
+            deep_size(raw[part]), deep_size(parsed[part]),
+            len(json.dumps(raw[part], separators=(',', ':'))), len(weather_models.dumps(parsed[part])),
+        ]
+        totals = [total + value for total, value in zip(totals, row)]
+        print(f"  {part:<10} {row[0]:12,d} {row[1]:15,d} {row[2]:10,d} {row[3]:13,d}")
+    print(f"  {'total':<10} {totals[0]:12,d} {totals[1]:15,d} {totals[2]:10,d} {totals[3]:13,d}   "
+          f"({totals[0] / totals[1]:.0f}x smaller in memory)")
+
+    print("\nDecode + parse per forecast response")
+    for label, loads in (("json", json.loads), ("weather_models.decode_json", weather_models.decode_json)):
+        seconds = min(timeit.repeat(lambda: weather_models.parse_forecast(loads(raw_text['forecast'])),
+                                    number=200, repeat=5)) / 200
+        print(f"  {label:<28} {seconds * 1e6:8.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Per-interaction server CPU time: full-page rerun vs. fragment rerun.
+
+Streamlit's AppTest always re-executes the whole script, so the "full page"
+column is what every interaction cost before the page was split into
+fragments. The "fragment" column runs only the fragment that owns the
+widget, which is what a fragment-scoped rerun executes now. Caches are warm
+in both cases (stub upstream), so the numbers isolate rendering work.
+
+An actual theme switch is not fragment-scoped: the theme fragment calls
+``st.rerun(scope="app")`` so charts and maps follow the new theme. It costs
+a full-page rerun plus the start of the aborted one, which is what AppTest
+measures for it; clicking the active theme again stays in the fragment.
+
+    python benchmarks/bench_reruns.py
+"""
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_server import start_stub_server  # noqa: E402
+
+REPEATS = 10
+
+
+def theme_fragment():
+    import sys, os
+    sys.path.insert(0, os.environ['BENCH_REPO_ROOT'])
+    import streamlit as st
+    from ui_components import render_theme_settings
+    st.session_state.setdefault('theme', 'light')
+    render_theme_settings()
+
+
+def map_fragment():
+    import sys, os
+    sys.path.insert(0, os.environ['BENCH_REPO_ROOT'])
+    import streamlit as st
+    from ui_components import render_map
+    st.session_state.setdefault('theme', 'light')
+    render_map('metric')
+
+
+def city_fragment():
+    import sys, os
+    sys.path.insert(0, os.environ['BENCH_REPO_ROOT'])
+    import streamlit as st
+    from app import render_city_search
+    st.session_state.setdefault('theme', 'light')
+    render_city_search('metric')
+
+
+def cpu_time(at, interact):
+    samples = []
+    for i in range(REPEATS):
+        interact(at, i)
+        start = time.process_time()
+        at.run()
+        samples.append(time.process_time() - start)
+    return statistics.median(samples)
+
+
+def switch_theme(at, i):
+    at.button(key='dark_btn' if i % 2 == 0 else 'light_btn').click()
+
+
+def click_active_theme(at, i):
+    at.button(key='light_btn').click()
+
+
+def submit_search(at):
+    next(button for button in at.button if button.label == "Search").click()
+
+
+def type_map_query(at, i):
+    at.text_input(key='map_search').input('London' if i % 2 == 0 else 'Paris')
+    submit_search(at)
+
+
+def type_city(at, i):
+    at.text_input[0].input('London' if i % 2 == 0 else 'Paris')
+    submit_search(at)
+
+
+def main():
+    stub = start_stub_server()
+    os.environ['OPENWEATHER_API_ROOT'] = stub.url
+    os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+    os.environ['WEATHER_CACHE_PATH'] = ''
+    os.environ['WEATHER_HISTORY_PATH'] = ''
+    os.environ['BENCH_REPO_ROOT'] = ROOT
+    os.chdir(ROOT)
+
+    from streamlit.testing.v1 import AppTest
+
+    def full_page(mode):
+        at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60).run()
+        at.radio[0].set_value(mode).run()
+        return at
+
+    scenarios = [
+        ("theme re-click", lambda: full_page("City Search"), theme_fragment, click_active_theme),
+        ("map search query", lambda: full_page("Map Selection"), map_fragment, type_map_query),
+        ("city search query", lambda: full_page("City Search"), city_fragment, type_city),
+    ]
+
+    print(f"Median server CPU per interaction over {REPEATS} runs (warm caches)")
+    switch = cpu_time(full_page("City Search"), switch_theme)
+    print(f"  {'theme switch':<20} full page {switch * 1e3:8.1f} ms   (reruns the app; not fragment-scoped)")
+    for label, make_full, fragment, interact in scenarios:
+        full = cpu_time(make_full(), interact)
+        at = AppTest.from_function(fragment, default_timeout=60).run()
+        partial = cpu_time(at, interact)
+        print(f"  {label:<20} full page {full * 1e3:8.1f} ms   fragment {partial * 1e3:8.1f} ms   "
+              f"({full / partial:4.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Fetch-layer and upstream calls made by one scripted user session.
+
+Drives ``app.py`` with Streamlit's AppTest against the stub upstream
+through a typical session: search a city, flip units back and forth,
+resubmit the same city with different spacing/case, search another city,
+use the map search, and return to the city view. Each query is submitted
+with the form's Search button when there is one.
+
+Counts calls into ``weather_utils`` (cache lookups included) and requests
+that reached the stub. ``--expired`` sets every cache TTL to zero, which is
+what a session spanning cache expiry (or a cold cache) sees::
+
+    python benchmarks/bench_search_session.py [--expired]
+"""
+import argparse
+import collections
+import functools
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_server import start_stub_server  # noqa: E402
+
+FETCH_FUNCTIONS = ('get_weather_data', 'get_forecast_data', 'get_weather_by_coords', 'geocode_location')
+
+
+def count_calls(counts):
+    """Wrap the ``weather_utils`` fetch functions to count their calls."""
+    import geocoding
+    import weather_utils
+
+    for name in FETCH_FUNCTIONS:
+        original = getattr(weather_utils, name)
+
+        @functools.wraps(original)
+        def counted(*args, _original=original, _name=name, **kwargs):
+            counts[_name] += 1
+            return _original(*args, **kwargs)
+
+        setattr(weather_utils, name, counted)
+        if hasattr(geocoding, name):
+            setattr(geocoding, name, counted)
+
+
+def submit(at, text, index=0):
+    """Type ``text`` into text input ``index`` and submit it like a user would."""
+    at.text_input[index].input(text)
+    buttons = [button for button in at.button if button.label == "Search"]
+    if buttons:
+        buttons[0].click()
+    return at.run()
+
+
+def session(at):
+    """The scripted interactions; returns the number of page reruns."""
+    steps = [
+        lambda: at.run(),
+        lambda: submit(at, "London"),
+        lambda: at.selectbox[0].set_value("Imperial (°F)").run(),
+        lambda: at.selectbox[0].set_value("Metric (°C)").run(),
+        lambda: submit(at, "  london "),
+        lambda: submit(at, "Paris"),
+        lambda: at.selectbox[0].set_value("Imperial (°F)").run(),
+        lambda: at.radio[0].set_value("Map Selection").run(),
+        lambda: submit(at, "Berlin"),
+        lambda: at.selectbox[0].set_value("Metric (°C)").run(),
+        lambda: at.radio[0].set_value("City Search").run(),
+        lambda: at.selectbox[0].set_value("Imperial (°F)").run(),
+    ]
+    for step in steps:
+        step()
+        if at.exception:
+            raise RuntimeError(at.exception)
+    return len(steps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--expired', action='store_true', help="zero cache TTLs (every lookup misses)")
+    args = parser.parse_args()
+
+    stub = start_stub_server()
+    os.environ.update(
+        OPENWEATHER_API_ROOT=stub.url, OPENWEATHER_API_KEY='benchmark', WEATHER_CACHE_PATH='',
+        WEATHER_HISTORY_PATH='', WEATHER_REFRESH_BUDGET_SHARE='0',
+    )
+    os.chdir(ROOT)
+
+    import weather_utils
+    from streamlit.testing.v1 import AppTest
+
+    if args.expired:
+        weather_utils.WEATHER_CACHE_TTL = weather_utils.FORECAST_CACHE_TTL = weather_utils.GEOCODE_CACHE_TTL = 0
+        weather_utils._response_cache.stale_ttl = 0
+
+    counts = collections.Counter()
+    count_calls(counts)
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60)
+    started = time.perf_counter()
+    reruns = session(at)
+    elapsed = time.perf_counter() - started
+
+    print(f"{reruns} interactions in {elapsed:.1f} s ({'expired' if args.expired else 'warm'} caches)")
+    for name in FETCH_FUNCTIONS:
+        print(f"  {name:<22} {counts[name]:4d} calls")
+    print(f"  {'fetch-layer total':<22} {sum(counts.values()):4d}")
+    print(f"  {'upstream requests':<22} {sum(stub.calls.values()):4d}  {dict(stub.calls)}")
+    try:
+        from search_session import get_search_stats
+    except ImportError:
+        return
+    print(f"  search dispatch        {get_search_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Load generator: N concurrent sessions against the stub upstream.
+
+Each simulated session loops over page views (City Search, Map Selection
+or a Multi-City Dashboard, in a fixed mix) for cities drawn from a Zipf-like
+popularity distribution, with think time between views. A page view runs
+the same server-side work the page does on a rerun: fetching through
+``weather_utils``, aggregation, the chart figure and its serialization, or
+the map HTML. Streamlit's element protocol is not exercised; AppTest
+cannot run sessions concurrently (see ``bench_e2e.py`` for full reruns).
+
+Reports p50/p95/p99 page latency per page type and upstream calls per page.
+Exits non-zero when ``--max-p95-ms`` or ``--max-calls-per-page`` is
+exceeded, so it can gate a deploy::
+
+    python benchmarks/load_test.py --sessions 20 --duration 30 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_server import start_stub_server  # noqa: E402
+
+PAGE_MIX = {'city': 0.6, 'map': 0.25, 'dashboard': 0.15}
+DASHBOARD_SIZE = 5
+
+
+def make_pages():
+    """Page-view callables keyed by page type; each returns False on a degraded page."""
+    import plotly.io as pio
+
+    import app
+    import ui_components
+    import weather_utils
+    from figure_cache import cached_figure
+    from forecast_aggregation import aggregate_daily
+    from geocoding import resolve_location
+
+    def city_page(cities):
+        bundle = weather_utils.get_weather_bundle(cities[0])
+        if bundle['forecast'] is not None:
+            processed = app.process_forecast_data(bundle['forecast'])
+            fig = cached_figure('app_forecast', processed,
+                                lambda: app.build_forecast_figure(processed, '°C', 'plotly_white'), '°C', 'plotly_white')
+            pio.to_json(fig, validate=False)
+        return not bundle['errors']
+
+    def map_page(cities):
+        locations = resolve_location(cities[0], limit=5)
+        weather = weather_utils.get_weather_for_locations(locations)
+        markers = tuple(
+            (loc['lat'], loc['lon'], loc['name'], f"{w.temp:.1f}°C" if w else "Weather unavailable")
+            for loc, w in zip(locations, weather)
+        )
+        ui_components.build_map_html((locations[0]['lat'], locations[0]['lon']), 10, markers,
+                                     ui_components.MAP_TILES['light'])
+        return all(w is not None for w in weather)
+
+    def dashboard_page(cities):
+        forecasts, ok = {}, True
+        for city, bundle in weather_utils.iter_weather_bundles(cities):
+            ok = ok and not bundle['errors']
+            if bundle['forecast'] is not None:
+                forecasts[city] = bundle['forecast']
+        if forecasts:
+            aggregate_daily(forecasts)
+        return ok
+
+    return {'city': city_page, 'map': map_page, 'dashboard': dashboard_page}
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        value = samples[0] if samples else float('nan')
+        return value, value, value
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=20.0, help="seconds of load")
+    parser.add_argument('--cities', type=int, default=200, help="size of the city population")
+    parser.add_argument('--think', type=float, default=0.1, help="mean think time between page views")
+    parser.add_argument('--latency', type=float, default=0.05, help="stub upstream latency")
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-p95-ms', type=float, help="fail if any page type's p95 exceeds this")
+    parser.add_argument('--max-calls-per-page', type=float, help="fail if upstream calls per page exceed this")
+    args = parser.parse_args()
+
+    stub = start_stub_server(args.latency, args.jitter, args.error_rate, seed=args.seed)
+    os.environ['OPENWEATHER_API_ROOT'] = stub.url
+    os.environ['OPENWEATHER_API_KEY'] = 'benchmark'
+    os.environ['WEATHER_CACHE_PATH'] = ''
+    os.environ['WEATHER_HISTORY_PATH'] = ''
+    os.environ['OPENWEATHER_CALLS_PER_MINUTE'] = str(10 ** 9)
+    os.environ['OPENWEATHER_CALLS_PER_DAY'] = str(10 ** 9)
+    os.chdir(ROOT)
+
+    pages = make_pages()
+    # One warm-up view per page type keeps one-time imports out of the numbers
+    for page in pages.values():
+        page(['warm-up'] * DASHBOARD_SIZE)
+    stub.calls.clear()
+    population = [f"city-{rank}" for rank in range(args.cities)]
+    weights = [1 / (rank + 1) for rank in range(args.cities)]
+    latencies = {page: [] for page in pages}
+    failures = {page: 0 for page in pages}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def session(seed):
+        rng = random.Random(seed)
+        while time.monotonic() < deadline:
+            page = rng.choices(list(PAGE_MIX), list(PAGE_MIX.values()))[0]
+            cities = rng.choices(population, weights, k=DASHBOARD_SIZE if page == 'dashboard' else 1)
+            start = time.perf_counter()
+            try:
+                ok = pages[page](cities)
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[page].append(elapsed)
+                failures[page] += not ok
+            time.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+
+    threads = [threading.Thread(target=session, args=(args.seed * 1000 + i,)) for i in range(args.sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    total_pages = sum(len(samples) for samples in latencies.values())
+    upstream = sum(stub.calls.values())
+    calls_per_page = upstream / max(total_pages, 1)
+    print(f"{args.sessions} sessions, {args.duration:.0f} s, {args.cities} cities, stub latency "
+          f"{args.latency * 1e3:.0f}±{args.jitter * 1e3:.0f} ms, error rate {args.error_rate:.1%}")
+    print(f"  {'page':<10} {'views':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'degraded':>9}")
+    worst_p95 = 0.0
+    for page, samples in latencies.items():
+        p50, p95, p99 = percentiles(samples)
+        if samples:
+            worst_p95 = max(worst_p95, p95)
+        print(f"  {page:<10} {len(samples):6d} {p50 * 1e3:8.1f} {p95 * 1e3:8.1f} {p99 * 1e3:8.1f} "
+              f"{failures[page]:9d}")
+    print(f"  {total_pages / wall:.1f} pages/s, {upstream} upstream calls "
+          f"({calls_per_page:.2f} per page, {stub.errors} injected errors)")
+
+    failed = []
+    if args.max_p95_ms is not None and worst_p95 * 1e3 > args.max_p95_ms:
+        failed.append(f"p95 {worst_p95 * 1e3:.1f} ms > {args.max_p95_ms:.1f} ms")
+    if args.max_calls_per_page is not None and calls_per_page > args.max_calls_per_page:
+        failed.append(f"{calls_per_page:.2f} upstream calls per page > {args.max_calls_per_page:.2f}")
+    if failed:
+        print("FAILED: " + "; ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
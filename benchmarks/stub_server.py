@@ -0,0 +1,135 @@
+"""Local stand-in for the OpenWeather API used by the benchmarks.
+
+Replays the ``/data/2.5/weather``, ``/data/2.5/forecast`` and
+``/geo/1.0/direct`` fixtures in ``benchmarks/fixtures`` (with the requested
+place name substituted in), with optional injected latency, jitter and
+errors. Start it in process with ``start_stub_server()`` and point the app
+at it through ``OPENWEATHER_API_ROOT`` before importing ``weather_utils``,
+or run it standalone::
+
+    python benchmarks/stub_server.py --port 8765 --latency 0.05 --error-rate 0.02
+    OPENWEATHER_API_ROOT=http://127.0.0.1:8765 streamlit run app.py
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+_FIXTURES = {name: load_fixture(name) for name in ('weather', 'forecast', 'geocode')}
+
+
+def weather_payload(city):
+    payload = copy.deepcopy(_FIXTURES['weather'])
+    payload['name'] = city.title()
+    return payload
+
+
+def forecast_payload(city):
+    payload = copy.deepcopy(_FIXTURES['forecast'])
+    payload['city']['name'] = city.title()
+    return payload
+
+
+def geocode_payload(query, limit):
+    places = copy.deepcopy(_FIXTURES['geocode'][:limit])
+    for place in places:
+        place['name'] = query.title()
+    return places
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with server.lock:
+            server.calls[url.path] = server.calls.get(url.path, 0) + 1
+            delay = server.latency + server.random.uniform(0, server.jitter)
+            failed = server.random.random() < server.error_rate
+            if failed:
+                server.errors += 1
+        if delay:
+            time.sleep(delay)
+
+        city = query.get('q', 'unknown')
+        if failed:
+            status, body = server.error_status, {'cod': server.error_status, 'message': 'injected error'}
+        elif url.path == '/data/2.5/weather':
+            status, body = 200, weather_payload(city)
+        elif url.path == '/data/2.5/forecast':
+            status, body = 200, forecast_payload(city)
+        elif url.path == '/geo/1.0/direct':
+            status, body = 200, geocode_payload(city, int(query.get('limit', 5)))
+        else:
+            status, body = 404, {'cod': '404', 'message': 'not found'}
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, port=0, seed=0):
+    """Start the stub on ``port`` (ephemeral by default) on a daemon thread.
+
+    Each request sleeps ``latency`` plus up to ``jitter`` seconds, and a
+    ``error_rate`` fraction of requests answer ``error_status`` instead.
+    Returns the server (``.url``, ``.calls`` per path, ``.errors``).
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.random = random.Random(seed)
+    server.calls = {}
+    server.errors = 0
+    server.lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name='stub-openweather', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument('--error-status', type=int, default=500)
+    args = parser.parse_args()
+    server = start_stub_server(args.latency, args.jitter, args.error_rate, args.error_status, args.port)
+    print(f"Stub OpenWeather API at {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
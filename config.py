@@ -1,19 +1,4 @@
 import os
-from dotenv import load_dotenv
-import streamlit as st
-
-# Load .env file if it exists (for local development)
-if os.path.exists(".env"):
-    load_dotenv()
-
-# Attempt to load API key from Streamlit secrets first
-try:
-    OPENWEATHER_API_KEY = st.secrets["openweather"]["OPENWEATHER_API_KEY"]
-except KeyError:
-    # Fallback to environment variable if not in secrets
-    OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
-    if not OPENWEATHER_API_KEY:
-        raise ValueError("OpenWeather API key not found. Please set it in Streamlit secrets or as an environment variable.")
 
 # API Configuration
 BASE_URL = "http://api.openweathermap.org/data/2.5"
@@ -21,4 +6,57 @@ BASE_URL = "http://api.openweathermap.org/data/2.5"
 # Map Configuration
 DEFAULT_LAT = 51.5074
 DEFAULT_LON = -0.1278
-DEFAULT_ZOOM = 10
\ No newline at end of file
+DEFAULT_ZOOM = 10
+
+
+# Resolved settings, kept once an API key has been found
+_config = {}
+
+
+def load_config():
+    """Resolve settings, caching them once an API key is found.
+
+    Streamlit secrets win (any path Streamlit searches, including
+    ``~/.streamlit/secrets.toml``); otherwise the environment is used, after
+    loading ``.env`` for local development. A missing key is looked up again
+    on the next call, so adding it later takes effect without a restart.
+    Streamlit and python-dotenv are only imported here, so importing this
+    module stays cheap.
+    """
+    if _config:
+        return _config
+
+    import streamlit as st
+    from streamlit.errors import StreamlitSecretNotFoundError
+
+    api_key = None
+    try:
+        api_key = st.secrets["openweather"]["OPENWEATHER_API_KEY"]
+    except (KeyError, FileNotFoundError, StreamlitSecretNotFoundError):
+        pass
+
+    if not api_key:
+        if os.path.exists(".env"):
+            from dotenv import load_dotenv
+            load_dotenv()
+        api_key = os.getenv("OPENWEATHER_API_KEY")
+
+    config = {"OPENWEATHER_API_KEY": api_key}
+    if api_key:
+        _config.update(config)
+    return config
+
+
+def get_api_key():
+    """Return the OpenWeather API key, raising if it is not configured."""
+    api_key = load_config()["OPENWEATHER_API_KEY"]
+    if not api_key:
+        raise ValueError("OpenWeather API key not found. Please set it in Streamlit secrets or as an environment variable.")
+    return api_key
+
+
+def __getattr__(name):
+    # Keep ``config.OPENWEATHER_API_KEY`` working without resolving it at import
+    if name == "OPENWEATHER_API_KEY":
+        return get_api_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,130 @@
+# disk_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """SQLite-backed JSON cache shared by every app process on a host.
+
+    The database runs in WAL mode so concurrent readers never block the
+    writer. Each row carries its wall-clock expiry; expired rows are kept for
+    ``retention`` seconds as last-known-good data before compaction drops
+    them. Compaction also trims the table to ``max_entries`` (oldest first)
+    and runs on a daemon thread every ``compact_interval`` seconds.
+
+    Values are stored as text produced by ``dumps`` and read back with
+    ``loads`` (JSON by default).
+    """
+
+    def __init__(self, path, max_entries=5000, retention=86400, compact_interval=300,
+                 dumps=None, loads=json.loads):
+        self.path = path
+        self.dumps = dumps or (lambda value: json.dumps(value, separators=(',', ':')))
+        self.loads = loads
+        self.max_entries = max_entries
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'compactions': 0, 'errors': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at)")
+
+        self._compactor = threading.Thread(target=self._compact_loop, name="disk-cache-compactor", daemon=True)
+        self._compactor.start()
+
+    def _connect(self):
+        """Return this thread's connection (sqlite3 connections are per-thread)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, event):
+        # Request threads and the compactor update the counters concurrently
+        with self._lock:
+            self.stats[event] += 1
+
+    @staticmethod
+    def _key(key):
+        return json.dumps(key) if not isinstance(key, str) else key
+
+    def get(self, key):
+        """Return ``(value, expires_at)`` for ``key``, or ``None``.
+
+        ``expires_at`` is a ``time.time()`` timestamp and may lie in the past;
+        freshness decisions are left to the caller.
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (self._key(key),)
+            ).fetchone()
+        except sqlite3.Error:
+            self._count('errors')
+            return None
+        if row is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return self.loads(row[0]), row[1]
+
+    def put(self, key, value, ttl):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (self._key(key), self.dumps(value), now, now + ttl),
+                )
+            self._count('writes')
+        except sqlite3.Error:
+            # The disk tier is an optimization; never fail a request over it.
+            self._count('errors')
+
+    def compact(self):
+        """Drop long-expired rows, enforce ``max_entries`` and reclaim space."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time() - self.retention,))
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._count('compactions')
+
+    def _compact_loop(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except sqlite3.Error:
+                self._count('errors')
+
+    def close(self, timeout=5):
+        """Stop background compaction, letting a running pass finish."""
+        self._stop.set()
+        if self._compactor is not threading.current_thread():
+            self._compactor.join(timeout)
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
@@ -0,0 +1,78 @@
+# figure_cache.py
+"""Content-addressed memoization of Plotly figures across reruns."""
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import metrics
+
+FIGURE_CACHE_SIZE = 128
+
+
+def content_hash(data):
+    """Stable digest of chart input data (a DataFrame or JSON-like records)."""
+    # Without pandas loaded, ``data`` cannot be a DataFrame; don't import it here
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(data, pd.DataFrame):
+        payload = pd.util.hash_pandas_object(data, index=True).values.tobytes()
+        payload += ",".join(map(str, data.columns)).encode()
+    else:
+        payload = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class FigureCache:
+    """Bounded LRU of built Plotly figures.
+
+    Figures are cached as ``go.Figure`` objects rather than JSON/dict specs:
+    ``st.plotly_chart`` re-validates dict input into a new figure, which
+    costs nearly as much as building it, while a ready figure is only
+    serialized.
+    """
+
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.stats['hits'] += 1
+                return figure
+            self.stats['misses'] += 1
+
+        with metrics.span('figure_build', chart=key[0]):
+            figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+
+_figure_cache = FigureCache()
+
+
+def cached_figure(kind, data, build, *variant):
+    """Return the figure for ``data``, building it only on a content-hash miss.
+
+    ``kind`` names the chart and ``variant`` carries anything else the
+    figure depends on (units, template); ``build()`` must only use ``data``
+    and ``variant``.
+    """
+    return _figure_cache.get_or_build((kind, content_hash(data)) + variant, build)
+
+
+def get_figure_cache_stats():
+    return {**_figure_cache.stats, 'size': len(_figure_cache._figures)}
+
+
+metrics.register_collector(lambda: [
+    ('weather_figure_cache_events_total', {'event': event}, count) for event, count in _figure_cache.stats.items()
+])
@@ -0,0 +1,143 @@
+# forecast_aggregation.py
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from weather_models import FORECAST_DTYPE
+
+SECONDS_PER_DAY = 86400
+
+
+def _local_day_numbers(timestamps):
+    """Map unix timestamps to local-calendar day numbers (days since epoch).
+
+    Matches ``datetime.fromtimestamp(ts).date()``. The UTC offset is applied
+    as one vectorized shift unless a DST change falls inside the window.
+    """
+    first = datetime.fromtimestamp(int(timestamps.min())).astimezone().utcoffset()
+    last = datetime.fromtimestamp(int(timestamps.max())).astimezone().utcoffset()
+    if first == last:
+        offsets = int(first.total_seconds())
+    else:
+        offsets = np.array([
+            datetime.fromtimestamp(int(ts)).astimezone().utcoffset().total_seconds()
+            for ts in timestamps
+        ], dtype=np.int64)
+    return (timestamps + offsets) // SECONDS_PER_DAY
+
+
+def forecast_columns(forecasts):
+    """Concatenate one or more parsed forecasts into a columnar dict of arrays.
+
+    ``forecasts`` maps a city label to a ``weather_models.Forecast``.
+    """
+    forecasts = list(forecasts.values())
+    if not forecasts:
+        series = np.empty(0, dtype=FORECAST_DTYPE)
+    else:
+        series = np.concatenate([forecast.series for forecast in forecasts])
+
+    # Per-forecast condition codes shifted into one shared conditions table
+    conditions = [pair for forecast in forecasts for pair in forecast.conditions]
+    offsets = np.cumsum([0] + [len(forecast.conditions) for forecast in forecasts])[:-1]
+    lengths = [len(forecast.series) for forecast in forecasts]
+    codes = series['condition'] + np.repeat(offsets, lengths).astype(np.int64)
+    descriptions = np.array([description for description, _ in conditions], dtype=object)
+    icons = np.array([icon for _, icon in conditions], dtype=object)
+
+    # Field views of a structured array are strided; copy them contiguous
+    return {
+        'city': np.repeat(np.arange(len(forecasts), dtype=np.int64), lengths),
+        'dt': np.ascontiguousarray(series['dt']),
+        'temp': np.ascontiguousarray(series['temp']),
+        'humidity': series['humidity'].astype(np.float64),
+        'wind_speed': np.ascontiguousarray(series['wind_speed']),
+        'description': descriptions[codes],
+        'icon': icons[codes],
+    }
+
+
+def aggregate_columns(columns, city_names, days=5):
+    """Aggregate columnar 3-hourly data into per-city daily rows.
+
+    Every statistic is computed with grouped NumPy reductions over the whole
+    batch; no per-city or per-day Python loops are involved. The ``city``
+    column is omitted when ``city_names`` is ``None``.
+    """
+    output_columns = ['date', 'max_temp', 'min_temp', 'avg_humidity', 'avg_wind', 'weather', 'icon']
+    if city_names is not None:
+        output_columns.insert(0, 'city')
+    if len(columns['dt']) == 0:
+        return pd.DataFrame(columns=output_columns)
+
+    day = _local_day_numbers(columns['dt'])
+    order = np.lexsort((columns['dt'], day, columns['city']))
+    city = columns['city'][order]
+    day = day[order]
+
+    # Contiguous (city, day) groups after the sort
+    boundary = np.empty(len(order), dtype=bool)
+    boundary[0] = True
+    boundary[1:] = (city[1:] != city[:-1]) | (day[1:] != day[:-1])
+    starts = np.flatnonzero(boundary)
+    group = np.cumsum(boundary) - 1
+    counts = np.diff(np.append(starts, len(order)))
+
+    temp = columns['temp'][order]
+    max_temp = np.maximum.reduceat(temp, starts)
+    min_temp = np.minimum.reduceat(temp, starts)
+    avg_humidity = np.add.reduceat(columns['humidity'][order], starts) / counts
+    avg_wind = np.add.reduceat(columns['wind_speed'][order], starts) / counts
+
+    # Dominant condition per day: most frequent description, ties broken by
+    # first occurrence; its icon is the first one seen for that description.
+    descriptions = columns['description'][order]
+    desc_values, desc_codes = np.unique(descriptions.astype(str), return_inverse=True)
+    pair = group * len(desc_values) + desc_codes
+    pair_values, pair_first, pair_counts = np.unique(pair, return_index=True, return_counts=True)
+    pair_group = pair_values // len(desc_values)
+    best = np.lexsort((pair_first, -pair_counts, pair_group))
+    best = best[np.r_[True, pair_group[best][1:] != pair_group[best][:-1]]]
+    dominant = pair_first[best]
+
+    # Keep the first ``days`` days of every city
+    group_city = city[starts]
+    city_starts = np.r_[0, np.flatnonzero(group_city[1:] != group_city[:-1]) + 1]
+    rank = np.arange(len(starts)) - np.repeat(city_starts, np.diff(np.append(city_starts, len(starts))))
+    keep = rank < days
+
+    daily = {
+        'date': day[starts][keep].astype('datetime64[D]'),
+        'max_temp': max_temp[keep],
+        'min_temp': min_temp[keep],
+        'avg_humidity': avg_humidity[keep],
+        'avg_wind': avg_wind[keep],
+        'weather': descriptions[dominant][keep],
+        'icon': columns['icon'][order][dominant][keep],
+    }
+    if city_names is not None:
+        daily['city'] = np.asarray(city_names, dtype=object)[group_city[keep]]
+    return pd.DataFrame(daily, columns=output_columns)
+
+
+def aggregate_daily(forecasts, days=5):
+    """Aggregate many cities' forecasts into daily rows in a single pass.
+
+    ``forecasts`` maps a city label to its parsed ``Forecast``. Returns a
+    DataFrame with one row per (city, date), limited to ``days`` per city.
+    """
+    return aggregate_columns(forecast_columns(forecasts), list(forecasts), days)
+
+
+def aggregate_forecast(forecast, days=5):
+    """Aggregate a single city's parsed ``Forecast`` into daily rows."""
+    return aggregate_columns(forecast_columns({None: forecast}), None, days)
+
+
+def forecast_key(forecast, days=5):
+    """Content key for memoizing the daily rows of a parsed ``Forecast``."""
+    digest = hashlib.blake2b(forecast.series.tobytes(), digest_size=16)
+    digest.update(repr(forecast.conditions).encode())
+    return digest.digest(), days
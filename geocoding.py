@@ -0,0 +1,159 @@
+# geocoding.py
+"""Location search: local gazetteer first, cached OpenWeather geocoding second.
+
+The gazetteer is optional. Point ``GAZETTEER_PATH`` at a GeoNames city dump
+(e.g. ``cities15000.txt`` from https://download.geonames.org/export/dump/)
+to resolve common place names and autocomplete prefixes without any network
+call. Without it every lookup goes to the (cached) remote API.
+"""
+import bisect
+import heapq
+import os
+import threading
+import time
+
+from weather_utils import geocode_location, normalize_city
+
+GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', 'data/cities15000.txt')
+
+# Column positions in the GeoNames tab-separated dump
+_GEONAMES_NAME = 1
+_GEONAMES_ASCIINAME = 2
+_GEONAMES_LAT = 4
+_GEONAMES_LON = 5
+_GEONAMES_COUNTRY = 8
+_GEONAMES_ADMIN1 = 10
+_GEONAMES_POPULATION = 14
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'local_hits': 0, 'remote_lookups': 0, 'local_time': 0.0, 'remote_time': 0.0}
+
+
+class Gazetteer:
+    """In-memory city list with a sorted prefix index.
+
+    ``_keys`` holds normalized names in sorted order and ``_places`` the
+    matching location dicts (OpenWeather geocoding shape), so a prefix scan
+    is two binary searches plus a slice.
+    """
+
+    def __init__(self, places):
+        indexed = []
+        for place in places:
+            names = {normalize_city(place['name'])}
+            if place.get('ascii_name'):
+                names.add(normalize_city(place['ascii_name']))
+            indexed.extend((name, place) for name in names)
+        indexed.sort(key=lambda item: (item[0], -item[1].get('population', 0)))
+        self._keys = [name for name, _ in indexed]
+        self._places = [place for _, place in indexed]
+
+    @classmethod
+    def from_geonames(cls, path):
+        places = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                places.append({
+                    'name': fields[_GEONAMES_NAME],
+                    'ascii_name': fields[_GEONAMES_ASCIINAME],
+                    'lat': float(fields[_GEONAMES_LAT]),
+                    'lon': float(fields[_GEONAMES_LON]),
+                    'country': fields[_GEONAMES_COUNTRY],
+                    'state': fields[_GEONAMES_ADMIN1],
+                    'population': int(fields[_GEONAMES_POPULATION] or 0),
+                })
+        return cls(places)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + '\uffff', lo)
+        return lo, hi
+
+    def lookup(self, query, limit=5):
+        """Exact-name matches for ``query``, most populous first.
+
+        Accepts OpenWeather-style ``"City"`` or ``"City, CC"`` queries.
+        """
+        parts = [part.strip() for part in query.split(',')]
+        name = normalize_city(parts[0])
+        country = parts[-1].upper() if len(parts) > 1 and len(parts[-1]) == 2 else None
+
+        lo = bisect.bisect_left(self._keys, name)
+        hi = bisect.bisect_right(self._keys, name, lo)
+        matches = self._places[lo:hi]
+        if country:
+            matches = [place for place in matches if place['country'] == country]
+        return _unique(matches)[:limit]
+
+    def autocomplete(self, prefix, limit=5):
+        """Places whose name starts with ``prefix``, most populous first."""
+        prefix = normalize_city(prefix)
+        if not prefix:
+            return []
+        lo, hi = self._range(prefix)
+        matches = heapq.nlargest(2 * limit, self._places[lo:hi], key=lambda place: place.get('population', 0))
+        return _unique(matches)[:limit]
+
+
+def _unique(places):
+    """Drop duplicates caused by a place being indexed under two names."""
+    seen = set()
+    result = []
+    for place in places:
+        if id(place) not in seen:
+            seen.add(id(place))
+            result.append(place)
+    return result
+
+
+def get_gazetteer():
+    """Load the gazetteer once per process; ``None`` when no dump is available."""
+    global _gazetteer
+    if _gazetteer is None and GAZETTEER_PATH and os.path.exists(GAZETTEER_PATH):
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_geonames(GAZETTEER_PATH)
+    return _gazetteer
+
+
+def resolve_location(query, limit=5):
+    """Resolve ``query`` to candidate places, using the network only on a local miss."""
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        start = time.perf_counter()
+        places = gazetteer.lookup(query, limit)
+        if places:
+            with _stats_lock:
+                _stats['local_hits'] += 1
+                _stats['local_time'] += time.perf_counter() - start
+            return places
+
+    start = time.perf_counter()
+    places = geocode_location(query, limit)
+    with _stats_lock:
+        _stats['remote_lookups'] += 1
+        _stats['remote_time'] += time.perf_counter() - start
+    return places
+
+
+def suggest_locations(prefix, limit=5):
+    """Instant prefix autocomplete from the gazetteer (empty without one)."""
+    gazetteer = get_gazetteer()
+    return gazetteer.autocomplete(prefix, limit) if gazetteer is not None else []
+
+
+def get_geocoding_stats():
+    """Return local hit rate and mean lookup latency per source."""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['local_hits'] + stats['remote_lookups']
+    stats['local_hit_rate'] = stats['local_hits'] / total if total else 0.0
+    stats['avg_local_time'] = stats['local_time'] / stats['local_hits'] if stats['local_hits'] else 0.0
+    stats['avg_remote_time'] = stats['remote_time'] / stats['remote_lookups'] if stats['remote_lookups'] else 0.0
+    return stats
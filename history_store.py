@@ -0,0 +1,201 @@
+# history_store.py
+"""Append-only columnar history of fetched forecasts and observations.
+
+Rows are NumPy structured arrays (``HISTORY_DTYPE``) stored as ``.npy``
+segments under ``<root>/<city>/<kind>/<UTC day of dt>/``, where ``kind`` is
+``forecast`` or ``observed``. Each append writes one new segment per day it
+touches, after dropping rows whose ``(dt, issued_at)`` is already stored, so
+refetching the same forecast issuance adds nothing. Range queries only
+read the day partitions they need; recently read or written partitions stay
+in memory until their segment listing changes, so an append does not read
+back what it just wrote.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+
+# ``issued_at`` is the forecast issuance (model run) time; for observations
+# it equals ``dt``, the time the conditions were measured.
+HISTORY_DTYPE = np.dtype([
+    ('dt', np.int64),
+    ('issued_at', np.int64),
+    ('temp', np.float64),
+    ('humidity', np.uint8),
+    ('wind_speed', np.float64),
+    ('description', 'S32'),
+    ('icon', 'S4'),
+])
+
+KINDS = ('forecast', 'observed')
+
+
+def empty_rows():
+    return np.empty(0, dtype=HISTORY_DTYPE)
+
+
+def forecast_rows(forecast, issued_at):
+    """History rows for a parsed ``Forecast`` issued at ``issued_at``."""
+    series = forecast.series
+    rows = np.empty(len(series), dtype=HISTORY_DTYPE)
+    for name in ('dt', 'temp', 'humidity', 'wind_speed'):
+        rows[name] = series[name]
+    rows['issued_at'] = issued_at
+    descriptions = np.array([d.encode()[:32] for d, _ in forecast.conditions] or [b''], dtype='S32')
+    icons = np.array([i.encode()[:4] for _, i in forecast.conditions] or [b''], dtype='S4')
+    rows['description'] = descriptions[series['condition']]
+    rows['icon'] = icons[series['condition']]
+    return rows
+
+
+def observation_rows(weather):
+    """A one-row history array for a parsed ``CurrentWeather``."""
+    return np.array([(
+        weather.dt, weather.dt, weather.temp, weather.humidity, weather.wind_speed,
+        weather.description.encode()[:32], weather.icon.encode()[:4],
+    )], dtype=HISTORY_DTYPE)
+
+
+def _keys(rows):
+    """Pack ``(dt, issued_at)`` into one int64; exact for leads under ~34 years."""
+    dt = rows['dt'].astype(np.int64)
+    return (dt << 31) | ((dt - rows['issued_at']) & (2 ** 31 - 1))
+
+
+def _unique_keys(rows):
+    """Drop duplicate ``(dt, issued_at)`` rows and sort by them."""
+    if len(rows) == 0:
+        return rows
+    rows = rows[np.lexsort((rows['issued_at'], rows['dt']))]
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = (rows['dt'][1:] != rows['dt'][:-1]) | (rows['issued_at'][1:] != rows['issued_at'][:-1])
+    return rows[keep]
+
+
+def latest_per_dt(rows, min_lead=0):
+    """For each ``dt``, the most recently issued row at least ``min_lead`` seconds ahead."""
+    rows = rows[rows['dt'] - rows['issued_at'] >= min_lead]
+    rows = rows[np.lexsort((rows['issued_at'], rows['dt']))]
+    last = np.ones(len(rows), dtype=bool)
+    last[:-1] = rows['dt'][1:] != rows['dt'][:-1]
+    return rows[last]
+
+
+class HistoryStore:
+    """Append-only, day-partitioned store of history rows per city.
+
+    A partition holding more than ``max_segments`` segments is merged into
+    one on the next append to it. Writes are atomic (temporary file plus
+    rename) and never raise; queries also dedup, so concurrent writers in
+    other processes can at worst store a row twice.
+    """
+
+    def __init__(self, root, max_segments=16, max_cached_partitions=256):
+        self.root = root
+        self.max_segments = max_segments
+        self.max_cached_partitions = max_cached_partitions
+        self._partitions = OrderedDict()  # path -> (segment names, rows)
+        self._lock = threading.Lock()  # guards the partition cache
+        self._append_lock = threading.Lock()
+        self.stats = {'appended': 0, 'duplicates': 0, 'merges': 0, 'errors': 0}
+
+    def _partition(self, city, kind, day):
+        return os.path.join(self.root, quote(city, safe=''), kind, str(day))
+
+    @staticmethod
+    def _segments(path):
+        try:
+            return sorted(name for name in os.listdir(path) if name.endswith('.npy'))
+        except FileNotFoundError:
+            return []
+
+    def _read_partition(self, path):
+        return self._load_partition(path)[1]
+
+    def _load_partition(self, path):
+        """Return ``(segment names, rows)``; names are ``None`` if a segment vanished."""
+        names = tuple(self._segments(path))
+        with self._lock:
+            cached = self._partitions.get(path)
+            if cached is not None and cached[0] == names:
+                self._partitions.move_to_end(path)
+                return cached
+        segments = []
+        for name in names:
+            try:
+                segments.append(np.load(os.path.join(path, name)))
+            except FileNotFoundError:
+                # Merged away by another process since the listing
+                pass
+        rows = np.concatenate(segments) if segments else empty_rows()
+        if len(segments) != len(names):
+            return None, rows
+        self._remember(path, names, rows)
+        return names, rows
+
+    def _remember(self, path, names, rows):
+        with self._lock:
+            self._partitions[path] = (names, rows)
+            self._partitions.move_to_end(path)
+            while len(self._partitions) > self.max_cached_partitions:
+                self._partitions.popitem(last=False)
+
+    def _write_segment(self, path, rows):
+        os.makedirs(path, exist_ok=True)
+        name = f"{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}.npy"
+        temporary = os.path.join(path, f".{name}.tmp")
+        with open(temporary, 'wb') as handle:
+            np.save(handle, rows)
+        os.replace(temporary, os.path.join(path, name))
+        return name
+
+    def append(self, city, kind, rows):
+        """Store ``rows`` (``HISTORY_DTYPE``) for ``city``; returns how many were new."""
+        added = 0
+        try:
+            with self._append_lock:
+                for day in np.unique(rows['dt'] // SECONDS_PER_DAY):
+                    path = self._partition(city, kind, int(day))
+                    names, existing = self._load_partition(path)
+                    batch = _unique_keys(rows[rows['dt'] // SECONDS_PER_DAY == day])
+                    fresh = batch[~np.isin(_keys(batch), _keys(existing))] if len(existing) else batch
+                    self.stats['duplicates'] += len(batch) - len(fresh)
+                    if len(fresh) == 0:
+                        continue
+                    name = self._write_segment(path, fresh)
+                    added += len(fresh)
+                    if names is None:
+                        continue
+                    # Extend the cached partition instead of reading it back
+                    names, stored = tuple(sorted(names + (name,))), np.concatenate([existing, fresh])
+                    self._remember(path, names, stored)
+                    if len(names) > self.max_segments:
+                        self._merge(path, names, stored)
+            self.stats['appended'] += added
+        except (OSError, ValueError):
+            # History is a nice-to-have; never fail a fetch over it.
+            self.stats['errors'] += 1
+        return added
+
+    def _merge(self, path, names, rows):
+        merged = _unique_keys(rows)
+        name = self._write_segment(path, merged)
+        for old in names:
+            os.remove(os.path.join(path, old))
+        self._remember(path, (name,), merged)
+        self.stats['merges'] += 1
+
+    def query(self, city, kind, start, end):
+        """Rows for ``city`` with ``start <= dt < end``, sorted by ``(dt, issued_at)``."""
+        parts = [
+            self._read_partition(self._partition(city, kind, day))
+            for day in range(int(start) // SECONDS_PER_DAY, int(end - 1) // SECONDS_PER_DAY + 1)
+        ]
+        rows = np.concatenate(parts) if parts else empty_rows()
+        rows = rows[(rows['dt'] >= start) & (rows['dt'] < end)]
+        return _unique_keys(rows)
@@ -0,0 +1,142 @@
+# http_client.py
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from rate_limiter import TokenBucket
+
+# Upstream root; override to point the app at a local stub server
+API_ROOT = os.getenv("OPENWEATHER_API_ROOT", "https://api.openweathermap.org")
+
+# Connection pool and timeout configuration
+POOL_SIZE = 10
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+# Retry policy: exponential backoff with full jitter on throttling/server errors
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Shared API quota for the single OpenWeather key (calls per minute / per day)
+CALLS_PER_MINUTE = int(os.getenv("OPENWEATHER_CALLS_PER_MINUTE", 60))
+CALLS_PER_DAY = int(os.getenv("OPENWEATHER_CALLS_PER_DAY", 30000))
+
+_quota = {
+    'minute': TokenBucket(CALLS_PER_MINUTE, CALLS_PER_MINUTE / 60),
+    'day': TokenBucket(CALLS_PER_DAY, CALLS_PER_DAY / 86400),
+}
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_endpoint_stats = {}
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """Raised when the shared API quota has no budget left for a call."""
+
+
+def _acquire_quota():
+    """Take one call from every quota bucket, or raise ``RateLimitExceeded``."""
+    acquired = []
+    for name, bucket in _quota.items():
+        if not bucket.try_acquire():
+            for taken in acquired:
+                taken.release()
+            raise RateLimitExceeded(f"OpenWeather API {name} quota exhausted")
+        acquired.append(bucket)
+
+
+def get_session():
+    """Return the shared keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _backoff_delay(attempt, response=None):
+    """Seconds to wait before retry ``attempt`` (1-based)."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def _record(endpoint, elapsed, retries, failed):
+    metrics.observe('upstream', elapsed, endpoint=endpoint)
+    with _stats_lock:
+        stats = _endpoint_stats.setdefault(
+            endpoint, {'calls': 0, 'errors': 0, 'retries': 0, 'total_time': 0.0, 'max_time': 0.0}
+        )
+        stats['calls'] += 1
+        stats['retries'] += retries
+        stats['total_time'] += elapsed
+        stats['max_time'] = max(stats['max_time'], elapsed)
+        if failed:
+            stats['errors'] += 1
+
+
+def get(url, params=None, timeout=None):
+    """GET ``url`` through the pooled session with timeouts and retries.
+
+    Retries connection errors and 429/5xx responses; the final response is
+    returned as-is so callers keep their own status-code handling. Network
+    errors are re-raised as ``requests.exceptions.RequestException``. Every
+    attempt draws from the shared quota; ``RateLimitExceeded`` is raised
+    when it is exhausted.
+    """
+    endpoint = urlparse(url).path
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    session = get_session()
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        _acquire_quota()
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= MAX_RETRIES:
+                _record(endpoint, time.perf_counter() - start, attempt, failed=True)
+                raise
+            attempt += 1
+            time.sleep(_backoff_delay(attempt))
+            continue
+
+        if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            attempt += 1
+            response.close()
+            time.sleep(_backoff_delay(attempt, response))
+            continue
+
+        _record(endpoint, time.perf_counter() - start, attempt, failed=response.status_code != 200)
+        return response
+
+
+def get_latency_stats():
+    """Return per-endpoint call counts, retries, errors and latency."""
+    with _stats_lock:
+        return {
+            endpoint: {**stats, 'avg_time': stats['total_time'] / stats['calls']}
+            for endpoint, stats in _endpoint_stats.items()
+        }
+
+
+def get_quota_stats():
+    """Return current utilization of the per-minute and per-day API budgets."""
+    return {name: bucket.snapshot() for name, bucket in _quota.items()}
@@ -0,0 +1,199 @@
+# metrics.py
+"""Lightweight in-process instrumentation with Prometheus text export.
+
+Stages are timed with ``span(stage)`` and aggregated into one histogram,
+``weather_stage_seconds``, labelled by stage. Counters that modules already
+keep (cache, quota, upstream stats) are exposed through
+``register_collector`` and only read at export time, so the hot path gains
+no extra bookkeeping.
+
+Everything is off unless ``WEATHER_METRICS`` is set; then ``span`` returns a
+shared no-op context manager and ``observe`` returns immediately. When on,
+the metrics are written to ``WEATHER_METRICS_FILE`` every
+``EXPORT_INTERVAL`` seconds and/or served at
+``http://localhost:$WEATHER_METRICS_PORT/metrics``.
+"""
+import atexit
+import bisect
+import contextlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.getenv('WEATHER_METRICS', '').lower() in ('1', 'true', 'yes', 'on')
+METRICS_FILE = os.getenv('WEATHER_METRICS_FILE', '')
+METRICS_PORT = int(os.getenv('WEATHER_METRICS_PORT', 0))
+EXPORT_INTERVAL = 15
+
+# Histogram bucket upper bounds (seconds)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_histograms = {}  # labels tuple -> [bucket counts..., +Inf count, sum]
+_collectors = []
+_local = threading.local()
+_NOOP = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ('stage', 'labels', 'start')
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.stage, time.perf_counter() - self.start, **self.labels)
+
+
+def span(stage, **labels):
+    """Context manager timing one ``stage`` (a no-op when metrics are off)."""
+    return _Span(stage, labels) if ENABLED else _NOOP
+
+
+def observe(stage, seconds, **labels):
+    """Record one ``seconds`` observation for ``stage``."""
+    if not ENABLED:
+        return
+    key = (('stage', stage),) + tuple(sorted(labels.items()))
+    index = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        histogram[index] += 1
+        histogram[-1] += seconds
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+@contextlib.contextmanager
+def trace():
+    """Collect ``(stage, seconds)`` for spans finished on this thread.
+
+    Yields the list being filled, or ``None`` when metrics are off. Work done
+    on other threads shows up only in the histograms unless it is wrapped
+    with ``traced``.
+    """
+    if not ENABLED:
+        yield None
+        return
+    previous = getattr(_local, 'trace', None)
+    _local.trace = spans = []
+    try:
+        yield spans
+    finally:
+        _local.trace = previous
+
+
+def traced(function):
+    """Wrap ``function`` so spans it records on another thread join this thread's trace."""
+    spans = getattr(_local, 'trace', None)
+    if spans is None:
+        return function
+
+    def run(*args, **kwargs):
+        previous = getattr(_local, 'trace', None)
+        _local.trace = spans
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.trace = previous
+    return run
+
+
+def register_collector(collect):
+    """Register ``collect()``, returning ``(name, labels, value)`` samples.
+
+    Names ending in ``_total`` are exported as counters, others as gauges.
+    """
+    _collectors.append(collect)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+def export_prometheus():
+    """Render all metrics in the Prometheus text exposition format."""
+    lines = [
+        '# HELP weather_stage_seconds Time spent per stage of a page render.',
+        '# TYPE weather_stage_seconds histogram',
+    ]
+    with _lock:
+        histograms = {key: list(values) for key, values in _histograms.items()}
+    for key, values in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), values):
+            cumulative += count
+            lines.append(f"weather_stage_seconds_bucket{_format_labels(key + (('le', bound),))} {cumulative}")
+        lines.append(f"weather_stage_seconds_sum{_format_labels(key)} {values[-1]}")
+        lines.append(f"weather_stage_seconds_count{_format_labels(key)} {cumulative}")
+
+    samples = {}
+    for collect in _collectors:
+        for name, labels, value in collect():
+            samples.setdefault(name, []).append((tuple(sorted(labels.items())), value))
+    for name, series in sorted(samples.items()):
+        lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+        lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in series)
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path):
+    """Atomically write the current metrics to ``path`` (e.g. for node_exporter)."""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as handle:
+        handle.write(export_prometheus())
+    os.replace(temporary, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = export_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve ``/metrics`` on a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def _export_loop(path):
+    while True:
+        time.sleep(EXPORT_INTERVAL)
+        try:
+            write_prometheus(path)
+        except OSError:
+            pass
+
+
+if ENABLED and METRICS_FILE:
+    threading.Thread(target=_export_loop, args=(METRICS_FILE,), name="metrics-export", daemon=True).start()
+    atexit.register(write_prometheus, METRICS_FILE)
+if ENABLED and METRICS_PORT:
+    try:
+        serve(METRICS_PORT)
+    except OSError:
+        # Another app process already serves this port
+        pass
@@ -0,0 +1,55 @@
+# rate_limiter.py
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket holding up to ``capacity`` tokens.
+
+    Tokens refill continuously at ``refill_rate`` per second. ``try_acquire``
+    never blocks: callers that find the bucket empty are expected to degrade
+    (e.g. serve cached data) rather than wait.
+    """
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self, tokens=1):
+        """Return unused tokens, e.g. when a sibling bucket refused the call."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def utilization(self):
+        """Fraction of the bucket currently spent (0.0 = idle, 1.0 = exhausted)."""
+        with self._lock:
+            self._refill()
+            return 1 - self._tokens / self.capacity
+
+    def snapshot(self):
+        with self._lock:
+            self._refill()
+            return {
+                'capacity': self.capacity,
+                'available': self._tokens,
+                'utilization': 1 - self._tokens / self.capacity,
+                'rejected': self.rejected,
+            }
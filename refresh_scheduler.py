@@ -0,0 +1,163 @@
+# refresh_scheduler.py
+import heapq
+import threading
+import time
+
+from rate_limiter import TokenBucket
+
+# Decayed scores below this are forgotten
+_FORGET_SCORE = 0.01
+
+
+def last_update(now, period, delay=0):
+    """Wall-clock time of the latest upstream update on a fixed cadence.
+
+    Updates happen every ``period`` seconds (aligned to the Unix epoch, i.e.
+    UTC) and become available ``delay`` seconds later.
+    """
+    return (now - delay) // period * period + delay
+
+
+class RefreshScheduler:
+    """Keeps the most requested cache entries warm from a background thread.
+
+    ``record(key)`` is called on every access and feeds an exponentially
+    decaying popularity score (halving every ``half_life`` seconds). Every
+    ``interval`` seconds the ``top_n`` hottest keys scoring at least
+    ``min_score`` are refetched through ``refresh(key)`` once they are within
+    ``lead_time`` of expiring, so users keep hitting fresh entries.
+
+    Kinds (``key[0]``) listed in ``aligned`` as ``(period, delay)`` change
+    upstream only on that cadence: they are refetched once after each update
+    and otherwise re-stored for ``ttls[kind]`` without a network call.
+
+    Refetches draw from the scheduler's own ``per_minute``/``per_day`` token
+    buckets, capping background traffic at a fixed share of the API budget.
+    Failed keys are retried after ``error_backoff`` seconds.
+    """
+
+    def __init__(self, cache, refresh, ttls, top_n=20, lead_time=60, interval=15, half_life=3600,
+                 min_score=1.0, per_minute=12, per_day=6000, aligned=None, error_backoff=300,
+                 max_tracked=1000):
+        self.cache = cache
+        self.refresh = refresh
+        self.ttls = ttls
+        self.top_n = top_n
+        self.lead_time = lead_time
+        self.interval = interval
+        self.half_life = half_life
+        self.min_score = min_score
+        self.aligned = aligned or {}
+        self.error_backoff = error_backoff
+        self.max_tracked = max_tracked
+        self._budget = {
+            'minute': TokenBucket(per_minute, per_minute / 60),
+            'day': TokenBucket(per_day, per_day / 86400),
+        }
+        self._scores = {}
+        self._retry_at = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'refreshes': 0, 'extensions': 0, 'errors': 0, 'budget_skips': 0}
+
+    def record(self, key):
+        """Count one access to ``key`` and make sure the scheduler is running."""
+        now = time.monotonic()
+        with self._lock:
+            score, seen = self._scores.get(key, (0.0, now))
+            self._scores[key] = (self._decay(score, now - seen) + 1, now)
+        if self._thread is None:
+            self.start()
+
+    def _decay(self, score, elapsed):
+        return score * 0.5 ** (elapsed / self.half_life)
+
+    def hottest(self):
+        """Return up to ``top_n`` keys by current score, dropping forgotten ones."""
+        now = time.monotonic()
+        with self._lock:
+            scored = [(self._decay(score, now - seen), key) for key, (score, seen) in self._scores.items()]
+            for score, key in scored:
+                if score < _FORGET_SCORE:
+                    del self._scores[key]
+            if len(self._scores) > self.max_tracked:
+                keep = heapq.nlargest(self.max_tracked, scored, key=lambda item: item[0])
+                self._scores = {key: self._scores[key] for _, key in keep if key in self._scores}
+        hot = heapq.nlargest(self.top_n, scored, key=lambda item: item[0])
+        return [key for score, key in hot if score >= self.min_score]
+
+    def run_once(self):
+        """Refresh or extend every hot key that needs it; returns refetch count."""
+        refreshed = 0
+        now = time.monotonic()
+        wall = time.time()
+        for key in self.hottest():
+            if self._retry_at.get(key, 0) > now:
+                continue
+            timing = self.cache.expiry(key)
+            if timing is None:
+                # Hot but evicted from memory: bring it back
+                due = True
+            else:
+                stored_at, expires_at = timing
+                expiring = expires_at - now <= self.lead_time
+                cadence = self.aligned.get(key[0])
+                if cadence is None:
+                    due = expiring
+                else:
+                    due = wall - (now - stored_at) < last_update(wall, *cadence)
+                    if not due and expiring:
+                        self._extend(key)
+            if due and self._refresh(key, now):
+                refreshed += 1
+        return refreshed
+
+    def _extend(self, key):
+        value = self.cache.peek(key)
+        if value is not None:
+            self.cache.put(key, value, self.ttls[key[0]])
+            self.stats['extensions'] += 1
+
+    def _refresh(self, key, now):
+        acquired = []
+        for bucket in self._budget.values():
+            if not bucket.try_acquire():
+                for taken in acquired:
+                    taken.release()
+                self.stats['budget_skips'] += 1
+                return False
+            acquired.append(bucket)
+        try:
+            self.refresh(key)
+        except Exception:
+            self._retry_at[key] = now + self.error_backoff
+            self.stats['errors'] += 1
+            return False
+        self._retry_at.pop(key, None)
+        self.stats['refreshes'] += 1
+        return True
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run_loop, name="cache-refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                self.stats['errors'] += 1
+
+    def close(self, timeout=5):
+        """Stop the background thread, letting an in-flight refresh finish."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def snapshot(self):
+        return {**self.stats, 'tracked': len(self._scores), 'hot': len(self.hottest())}
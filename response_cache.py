@@ -0,0 +1,142 @@
+# response_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache with stale-while-revalidate support.
+
+    Entries stay servable for ``stale_ttl`` seconds after they expire. A stale
+    hit returns the old payload immediately and refreshes it on a background
+    thread, so only a cold miss ever waits on the upstream call. Older
+    entries remain available through ``peek`` until evicted.
+
+    An optional ``backend`` (e.g. ``DiskCache``) acts as a shared second
+    level: memory misses are looked up there before fetching, and every
+    fetched value is written through to it.
+    """
+
+    def __init__(self, max_entries=256, stale_ttl=600, backend=None):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0, 'stale_hits': 0, 'backend_hits': 0, 'misses': 0, 'evictions': 0, 'refresh_errors': 0
+        }
+
+    def get(self, key):
+        """Return ``(value, is_fresh)`` for a servable entry, or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            now = time.monotonic()
+            if now > expires_at + self.stale_ttl:
+                return None
+            self._entries.move_to_end(key)
+            return value, now <= expires_at
+
+    def peek(self, key):
+        """Return the last stored value for ``key`` regardless of age.
+
+        Entries past their stale window are no longer served by ``get`` but
+        are kept (until LRU eviction) as a last resort for degraded mode.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry[0]
+        if self.backend is not None:
+            stored = self.backend.get(key)
+            if stored is not None:
+                return stored[0]
+        return None
+
+    def expiry(self, key):
+        """Return ``(stored_at, expires_at)`` (monotonic) for ``key`` in memory, or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return None if entry is None else (entry[2], entry[1])
+
+    def put(self, key, value, ttl):
+        """Store ``value`` in memory and write it through to the backend."""
+        self._put_local(key, value, ttl)
+        if self.backend is not None:
+            self.backend.put(key, value, ttl)
+
+    def _put_local(self, key, value, ttl, stored_at=None):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (value, now + ttl, now if stored_at is None else stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def _get_from_backend(self, key):
+        """Promote a servable backend entry into memory, keeping its expiry."""
+        stored = self.backend.get(key)
+        if stored is None:
+            return None
+        value, expires_at = stored
+        remaining = expires_at - time.time()
+        if remaining < -self.stale_ttl:
+            return None
+        # Fetch time is unknown for promoted entries; record them as oldest
+        self._put_local(key, value, remaining, stored_at=float('-inf'))
+        with self._lock:
+            self.stats['backend_hits'] += 1
+        return value, remaining > 0
+
+    def get_or_fetch(self, key, fetch, ttl):
+        """Serve ``key`` from cache, calling ``fetch()`` only when needed."""
+        cached = self.get(key)
+        if cached is None and self.backend is not None:
+            cached = self._get_from_backend(key)
+        if cached is not None:
+            value, is_fresh = cached
+            with self._lock:
+                if is_fresh:
+                    self.stats['hits'] += 1
+                else:
+                    self.stats['stale_hits'] += 1
+            if not is_fresh:
+                self._refresh_in_background(key, fetch, ttl)
+            return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        value = fetch()
+        self.put(key, value, ttl)
+        return value
+
+    def _refresh_in_background(self, key, fetch, ttl):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.put(key, fetch(), ttl)
+            except Exception:
+                # Keep serving the stale copy; the next stale hit retries.
+                with self._lock:
+                    self.stats['refresh_errors'] += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"cache-refresh-{key}", daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
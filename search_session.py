@@ -0,0 +1,124 @@
+# search_session.py
+"""Per-session dispatch of the search boxes' queries.
+
+Search boxes hand over a query on explicit submit (a form) or, for quick
+selections such as autocomplete suggestions, once the value has settled for
+a debounce interval. ``run_search`` normalizes the query and keeps the
+session's last successful result. Reruns caused by other widgets while that
+query is unchanged reuse it without any fetch call, for no longer than the
+current-weather TTL of the shared response cache; after that the query goes
+through the cache again.
+
+New queries run on a small worker pool while the script thread waits in
+short slices, updating a status placeholder. Each update is a Streamlit
+yield point, so a newer query interrupts the old script run right away
+instead of after its fetch. The superseded fetch is cancelled if it has not
+started; otherwise it finishes in the background and its result still lands
+in the shared response cache. Spans recorded by the worker are added to the
+caller's ``metrics.trace``.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import streamlit as st
+
+import metrics
+from weather_utils import WEATHER_CACHE_TTL, normalize_city
+
+# Settle time for debounced inputs (seconds)
+SEARCH_DEBOUNCE = float(os.getenv('WEATHER_SEARCH_DEBOUNCE', 0.3))
+
+# How long a session reuses the result of an unchanged query (seconds); the
+# shortest response-cache TTL among the data a search returns
+SEARCH_RESULT_TTL = WEATHER_CACHE_TTL
+
+# Interval between yield points while waiting (seconds)
+SEARCH_POLL_INTERVAL = 0.1
+
+# Only new queries run here, one per session at a time
+SEARCH_WORKERS = 8
+
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+_stats_lock = threading.Lock()
+_stats = {'dispatched': 0, 'reused': 0, 'debounced': 0, 'cancelled': 0, 'superseded': 0}
+
+
+def _count(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def get_search_stats():
+    """Return process-wide counters of dispatched, reused and dropped queries."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+metrics.register_collector(
+    lambda: [('weather_search_events_total', {'event': event}, count) for event, count in get_search_stats().items()]
+)
+
+
+def _wait(status, seconds, message):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        status.caption(message)
+        time.sleep(min(SEARCH_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+
+def run_search(slot, query, fetch, debounce=0.0, keep=None):
+    """Return ``fetch(query)``, dispatching each new query once and interruptibly.
+
+    ``slot`` names the search box. ``fetch`` receives the query with
+    whitespace collapsed. Results are held in session state for
+    ``SEARCH_RESULT_TTL`` seconds once ``keep(result)`` is true (default:
+    always); failed or degraded results are not, so the next rerun
+    dispatches them again. Returns ``None`` for an empty query; exceptions
+    from ``fetch`` propagate.
+    """
+    text = " ".join((query or "").split())
+    if not text:
+        return None
+    key = normalize_city(text)
+    state_key = f"_search_{slot}"
+    state = st.session_state.get(state_key)
+    if state is not None and state['key'] == key and time.monotonic() < state['expires_at']:
+        _count('reused')
+        return state['result']
+
+    status = st.empty()
+    message = f"🔎 Searching for {text}…"
+    future = None
+    try:
+        if debounce:
+            _wait(status, debounce, message)
+        future = _search_executor.submit(metrics.traced(fetch), text)
+        _count('dispatched')
+        while True:
+            try:
+                result = future.result(timeout=SEARCH_POLL_INTERVAL)
+                break
+            except FutureTimeoutError:
+                status.caption(message)
+    except Exception:
+        status.empty()
+        raise
+    except BaseException:
+        # Streamlit stops or reruns the script because a newer query arrived
+        if future is None:
+            _count('debounced')
+        elif not future.done():
+            _count('cancelled' if future.cancel() else 'superseded')
+        raise
+    status.empty()
+
+    if keep is None or keep(result):
+        st.session_state[state_key] = {
+            'key': key, 'result': result, 'expires_at': time.monotonic() + SEARCH_RESULT_TTL
+        }
+    else:
+        st.session_state.pop(state_key, None)
+    return result
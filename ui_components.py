@@ -1,12 +1,41 @@
 import streamlit as st
-import folium
-from streamlit_folium import folium_static
-import plotly.express as px
-from datetime import datetime
+from functools import lru_cache
 import requests
-import pandas as pd
+import csv
+import io
+import os
+import time
+from weather_utils import (
+    QuotaExhausted, convert_bundle, get_history, get_weather_bundle, get_weather_for_locations,
+    iter_weather_bundles, unique_cities
+)
+from unit_conversion import convert_weather
+from geocoding import resolve_location, suggest_locations
+from figure_cache import cached_figure
+from search_session import SEARCH_DEBOUNCE, run_search
+import metrics
 import config  # Ensure this module exists with API keys and defaults
 
+# Folium, Plotly and pandas are imported inside the functions that use them,
+# so each mode only pays for the libraries it actually renders with.
+
+# Rendered map HTML kept per (center, zoom, markers, tiles)
+MAP_CACHE_SIZE = 64
+MAP_HEIGHT = 500
+
+# Base map tiles per theme. CartoDB basemaps now require an API key, so the
+# dark theme uses CartoDB Dark Matter only when CARTO_API_KEY is set and
+# otherwise falls back to OpenStreetMap, which needs none. Entries are a
+# Folium tile name or a (URL template, attribution) pair.
+CARTO_API_KEY = os.getenv('CARTO_API_KEY', '')
+MAP_TILES = {"light": "OpenStreetMap", "dark": "OpenStreetMap"}
+if CARTO_API_KEY:
+    MAP_TILES["dark"] = (
+        f"https://{{s}}.basemaps.cartocdn.com/dark_all/{{z}}/{{x}}/{{y}}{{r}}.png?key={CARTO_API_KEY}",
+        '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors '
+        '&copy; <a href="https://carto.com/attributions">CARTO</a>',
+    )
+
 # Note: Create a config.py file with:
 # OPENWEATHER_API_KEY = "your_api_key"
 # DEFAULT_LAT = 51.5074  # e.g., London
@@ -28,14 +57,27 @@ def setup_page_config():
     
     # Theme switching in sidebar
     with st.sidebar:
-        st.title("🎨 Theme Settings")
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("🌞 Light", key="light_btn"):
-                st.session_state.theme = "light"
-        with col2:
-            if st.button("🌙 Dark", key="dark_btn"):
-                st.session_state.theme = "dark"
+        render_theme_settings()
+
+@st.fragment
+def render_theme_settings():
+    """Theme buttons plus the page CSS they control.
+
+    Runs as a fragment so clicking the already active theme stays local. An
+    actual switch reruns the whole app, since charts and maps elsewhere on
+    the page are built for the theme.
+    """
+    st.title("🎨 Theme Settings")
+    previous = st.session_state.theme
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🌞 Light", key="light_btn"):
+            st.session_state.theme = "light"
+    with col2:
+        if st.button("🌙 Dark", key="dark_btn"):
+            st.session_state.theme = "dark"
+    if st.session_state.theme != previous:
+        st.rerun(scope="app")
     
     # CSS for consistent styling across themes
     common_style = """
@@ -127,48 +169,46 @@ def render_current_weather(weather_data, units):
     
     col1, col2 = st.columns([3, 1])
     with col1:
-        st.markdown(f"**{weather_data['name']}, {weather_data['sys']['country']}**")
-        st.markdown(f"{weather_data['weather'][0]['description'].title()}")
+        st.markdown(f"**{weather_data.name}, {weather_data.country}**")
+        st.markdown(f"{weather_data.description.title()}")
         metric_col1, metric_col2 = st.columns(2)
         with metric_col1:
-            st.metric("Temperature", f"{weather_data['main']['temp']}{temp_unit}")
-            st.metric("Humidity", f"{weather_data['main']['humidity']}%")
+            st.metric("Temperature", f"{weather_data.temp}{temp_unit}")
+            st.metric("Humidity", f"{weather_data.humidity}%")
         with metric_col2:
-            st.metric("Feels Like", f"{weather_data['main']['feels_like']}{temp_unit}")
-            st.metric("Wind Speed", f"{weather_data['wind']['speed']} {speed_unit}")
+            st.metric("Feels Like", f"{weather_data.feels_like}{temp_unit}")
+            st.metric("Wind Speed", f"{weather_data.wind_speed} {speed_unit}")
     with col2:
-        icon_url = f"http://openweathermap.org/img/wn/{weather_data['weather'][0]['icon']}@4x.png"
+        icon_url = f"http://openweathermap.org/img/wn/{weather_data.icon}@4x.png"
         st.image(icon_url, width=150)
 
 def process_forecast_data(data, units):
     """Process forecast data into a 5-day structured DataFrame"""
-    daily_data = {}
-    for item in data['list']:
-        dt = datetime.fromtimestamp(item['dt']).date()
-        if dt not in daily_data:
-            daily_data[dt] = {'temps': [], 'humidity': [], 'wind_speed': [], 'icons': []}
-        daily_data[dt]['temps'].append(item['main']['temp'])
-        daily_data[dt]['humidity'].append(item['main']['humidity'])
-        daily_data[dt]['wind_speed'].append(item['wind']['speed'])
-        daily_data[dt]['icons'].append(item['weather'][0]['icon'])
-    
-    processed = []
-    for date, values in daily_data.items():
-        processed.append({
-            'date': date,
-            'max_temp': max(values['temps']),
-            'min_temp': min(values['temps']),
-            'avg_humidity': sum(values['humidity']) / len(values['humidity']),
-            'avg_wind': sum(values['wind_speed']) / len(values['wind_speed']),
-            'icon': max(set(values['icons']), key=values['icons'].count),
-            'wind_unit': 'm/s' if units == 'metric' else 'mph'
-        })
-    
-    processed.sort(key=lambda x: x['date'])
-    df = pd.DataFrame(processed[:5])
-    df['date_str'] = df['date'].apply(lambda x: x.strftime('%a, %b %d'))
+    from forecast_aggregation import aggregate_forecast
+
+    with metrics.span('aggregate'):
+        df = aggregate_forecast(data)
+    df['wind_unit'] = 'm/s' if units == 'metric' else 'mph'
+    df['date_str'] = df['date'].dt.strftime('%a, %b %d')
     return df
 
+def build_forecast_figure(df, units, template):
+    """Build the temperature trend chart for a daily forecast frame"""
+    import plotly.express as px
+
+    fig = px.line(df, x='date', y=['max_temp', 'min_temp'],
+                  labels={'value': f'Temperature ({units})', 'variable': 'Temperature'},
+                  title='Temperature Trends', template=template)
+    fig.update_layout(
+        hovermode='x unified',
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(t=60, l=40, r=40, b=40)
+    )
+    fig.update_traces(line=dict(width=3, color='#ff7f0e'), name='Max Temp', selector=dict(name='max_temp'))
+    fig.update_traces(line=dict(width=3, color='#1f77b4'), name='Min Temp', selector=dict(name='min_temp'))
+    return fig
+
 def render_forecast(forecast_data, units):
     """Display interactive 5-day forecast"""
     df = process_forecast_data(forecast_data, units)
@@ -181,18 +221,12 @@ def render_forecast(forecast_data, units):
         
         with tab1:
             template = 'plotly_dark' if st.session_state.theme == 'dark' else 'plotly_white'
-            fig = px.line(df, x='date', y=['max_temp', 'min_temp'],
-                          labels={'value': f'Temperature ({units})', 'variable': 'Temperature'},
-                          title='Temperature Trends', template=template)
-            fig.update_layout(
-                hovermode='x unified',
-                showlegend=True,
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-                margin=dict(t=60, l=40, r=40, b=40)
+            fig = cached_figure(
+                'forecast_trends', df[['date', 'max_temp', 'min_temp']],
+                lambda: build_forecast_figure(df, units, template), units, template
             )
-            fig.update_traces(line=dict(width=3, color='#ff7f0e'), name='Max Temp', selector=dict(name='max_temp'))
-            fig.update_traces(line=dict(width=3, color='#1f77b4'), name='Min Temp', selector=dict(name='min_temp'))
-            st.plotly_chart(fig, use_container_width=True)
+            with metrics.span('plotly_chart'):
+                st.plotly_chart(fig, width="stretch")
         
         with tab2:
             cols = st.columns(5)
@@ -214,8 +248,100 @@ def render_forecast(forecast_data, units):
         st.markdown("</div>", unsafe_allow_html=True)
 
 
-def render_map():
-    """Interactive map with theme-aware tiles and search"""
+def history_series(history, forecast_lead=24 * 3600):
+    """Chart series (ISO times and temperatures) from ``get_history`` rows.
+
+    Besides observations, shows for every forecast time the latest forecast
+    and the latest one issued at least ``forecast_lead`` seconds before it.
+    """
+    from history_store import latest_per_dt
+
+    def series(rows):
+        times = rows['dt'].astype('datetime64[s]').astype(str).tolist()
+        return {'x': times, 'y': rows['temp'].tolist()}
+
+    return {
+        'Observed': series(history['observed']),
+        'Latest forecast': series(latest_per_dt(history['forecast'])),
+        f"Forecast {forecast_lead // 3600} h ahead": series(latest_per_dt(history['forecast'], forecast_lead)),
+    }
+
+
+def build_history_figure(series, units, template):
+    """Build the observed vs forecast temperature chart"""
+    import plotly.graph_objects as go
+
+    temp_unit = "°C" if units == "metric" else "°F"
+    return go.Figure(
+        [go.Scatter(x=points['x'], y=points['y'], name=name, mode='lines+markers' if name == 'Observed' else 'lines')
+         for name, points in series.items()],
+        layout=dict(template=template, title='Observed vs Forecast Temperature',
+                    yaxis_title=f'Temperature ({temp_unit})', hovermode='x unified',
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                    margin=dict(t=60, l=40, r=40, b=40))
+    )
+
+
+@st.fragment
+def render_history(city, units):
+    """Multi-day temperature history for ``city`` from the local history store"""
+    with st.expander("📈 History"):
+        days = st.slider("Days of history", 1, 30, 7, key=f"history_days_{city}")
+        now = time.time()
+        # Include the days still covered by stored forecasts
+        history = get_history(city, now - days * 86400, now + 6 * 86400, units)
+        if len(history['observed']) + len(history['forecast']) == 0:
+            st.caption("No history recorded for this city yet; it builds up as forecasts are fetched.")
+            return
+        series = history_series(history)
+        template = 'plotly_dark' if st.session_state.get('theme') == 'dark' else 'plotly_white'
+        fig = cached_figure('history', series, lambda: build_history_figure(series, units, template), units, template)
+        with metrics.span('plotly_chart'):
+            st.plotly_chart(fig, width="stretch")
+
+
+@lru_cache(maxsize=MAP_CACHE_SIZE)
+def build_map_html(center, zoom, markers, tiles):
+    """Build and serialize the Folium map once per (center, zoom, markers, tiles).
+
+    ``markers`` is a tuple of ``(lat, lon, popup, tooltip)`` tuples. Unchanged
+    maps are served from this bounded LRU as ready-made HTML instead of being
+    rebuilt and re-rendered on every rerun.
+    """
+    import folium
+    import folium.plugins
+
+    tiles, attribution = (tiles, None) if isinstance(tiles, str) else tiles
+    m = folium.Map(location=list(center), zoom_start=zoom, tiles=tiles, attr=attribution)
+    for lat, lon, popup, tooltip in markers:
+        folium.Marker(
+            [lat, lon],
+            popup=popup,
+            tooltip=tooltip,
+            icon=folium.Icon(color='red', icon='info-sign')
+        ).add_to(m)
+
+    folium.plugins.Fullscreen().add_to(m)
+    folium.plugins.MousePosition().add_to(m)
+    folium.plugins.Draw(export=True, position='topleft', 
+                        draw_options={'polyline': False, 'rectangle': False, 'polygon': False, 'circle': False}).add_to(m)
+    return folium.Figure().add_child(m).render()
+
+metrics.register_collector(lambda: [
+    ('weather_map_cache_events_total', {'event': 'hits'}, build_map_html.cache_info().hits),
+    ('weather_map_cache_events_total', {'event': 'misses'}, build_map_html.cache_info().misses),
+])
+
+def search_locations(query):
+    """Geocode ``query`` and fetch current (metric) weather at each candidate place."""
+    with metrics.span('geocode'):
+        locations = resolve_location(query, limit=5)
+    weather = get_weather_for_locations(locations) if locations else []
+    return locations, weather
+
+@st.fragment
+def render_map(units="metric"):
+    """Interactive map with theme-aware tiles, search and per-marker weather"""
     with st.container():
         
         #st.markdown("<div class='weather-card'>", unsafe_allow_html=True)
@@ -225,43 +351,143 @@ def render_map():
             <h4 style = "font-size:2.1rem">Interactive Location Selection</h>
         """, unsafe_allow_html=True)
         
-        search_query = st.text_input("🔍 Search location:", placeholder="Enter city, state, or country", key="map_search")
+        with st.form("map_search_form", border=False):
+            search_query = st.text_input("🔍 Search location:", placeholder="Enter city, state, or country", key="map_search")
+            st.form_submit_button("Search")
+        suggestions = suggest_locations(search_query) if search_query else []
+        if suggestions:
+            labels = [f"{place['name']}, {place['country']}" for place in suggestions]
+            search_query = st.selectbox("Suggestions", [search_query] + labels, key="map_suggestion")
         
-        tiles = 'cartodbdark_matter' if st.session_state.theme == "dark" else 'cartodbpositron'
-       # m = folium.Map(location=[config.DEFAULT_LAT, config.DEFAULT_LON], zoom_start=config.DEFAULT_ZOOM, tiles=tiles)
-        m = folium.Map(location=[51.5074, -0.1278], zoom_start=10)  # Default: London
+        tiles = MAP_TILES[st.session_state.theme]
+        center = (config.DEFAULT_LAT, config.DEFAULT_LON)
+        markers = ()
         st.markdown("<div style='text-align: center;'>", unsafe_allow_html=True)
         if search_query:
             try:
-                url = "http://api.openweathermap.org/geo/1.0/direct"
-                params = {"q": search_query, "limit": 5, "appid": config.OPENWEATHER_API_KEY}
-                response = requests.get(url, params=params)
-                if response.status_code != 200:
-                    st.error("Failed to fetch location data. Check your API key or connection.")
+                # Suggestions can be flicked through quickly; only a settled choice is fetched
+                with metrics.span('fetch'):
+                    locations, weather = run_search(
+                        'map', search_query, search_locations,
+                        debounce=SEARCH_DEBOUNCE if suggestions else 0.0,
+                        keep=lambda result: all(w is not None and not w.stale for w in result[1])
+                    )
+                weather = [convert_weather(w, units) if w else None for w in weather]
+                if locations:
+                    temp_unit = "°C" if units == "metric" else "°F"
+                    marker_list = []
+                    for loc, loc_weather in zip(locations, weather):
+                        place = f"{loc.get('name', '')}, {loc.get('state', '')}, {loc.get('country', '')}"
+                        if loc_weather:
+                            summary = f"{loc_weather.temp:.1f}{temp_unit}, {loc_weather.description}"
+                        else:
+                            summary = "Weather unavailable"
+                        marker_list.append((loc['lat'], loc['lon'], f"{place}<br>{summary}", summary))
+                    markers = tuple(marker_list)
+                    center = (locations[0]['lat'], locations[0]['lon'])
                 else:
-                    locations = response.json()
-                    if locations:
-                        for loc in locations:
-                            folium.Marker(
-                                [loc['lat'], loc['lon']],
-                                popup=f"{loc.get('name', '')}, {loc.get('state', '')}, {loc.get('country', '')}",
-                                icon=folium.Icon(color='red', icon='info-sign')
-                            ).add_to(m)
-                        m.location = [locations[0]['lat'], locations[0]['lon']]
-                        m.zoom_start = 10
-                    else:
-                        st.warning("No locations found. Try a different search term.")
+                    st.warning("No locations found. Try a different search term.")
+            except QuotaExhausted:
+                st.warning("API quota reached and this search isn't cached yet. Please try again shortly.")
+            except ValueError as e:
+                st.error(f"Failed to fetch location data. Check your API key or connection. ({str(e)})")
             except requests.exceptions.RequestException as e:
                 st.error(f"Network error during search: {str(e)}")
         
-        folium.plugins.Fullscreen().add_to(m)
-        folium.plugins.MousePosition().add_to(m)
-        folium.plugins.Draw(export=True, position='topleft', 
-                            draw_options={'polyline': False, 'rectangle': False, 'polygon': False, 'circle': False}).add_to(m)
-        
-        folium_static(m, width=800, height=500)
+        with metrics.span('folium_render'):
+            map_html = build_map_html(center, config.DEFAULT_ZOOM, markers, tiles)
+        st.iframe(map_html, width=800, height=MAP_HEIGHT + 10)
         st.markdown("</div>", unsafe_allow_html=True)
 
+def parse_city_list(uploaded_file):
+    """Read city names from an uploaded .txt (one per line) or .csv file.
+
+    CSV files may have a ``city`` header column; otherwise the first column
+    is used.
+    """
+    text = uploaded_file.getvalue().decode("utf-8-sig")
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and row[0].strip()]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "city" in header:
+        column = header.index("city")
+        return [row[column].strip() for row in rows[1:] if len(row) > column and row[column].strip()]
+    return [row[0].strip() for row in rows]
+
+def render_multi_city_dashboard(cities, units):
+    """Comparison table and combined forecast chart for many cities.
+
+    Rows stream into the table as each city's data arrives, so slow cities
+    never hold up the ones that are already loaded.
+    """
+    import pandas as pd
+    import plotly.express as px
+    from forecast_aggregation import aggregate_daily
+
+    temp_unit = "°C" if units == "metric" else "°F"
+    speed_unit = "m/s" if units == "metric" else "mph"
+
+    # Repeats are fetched and shown once, so count them once
+    cities = unique_cities(cities)
+    st.subheader(f"📊 Comparing {len(cities)} cities")
+    progress = st.progress(0.0)
+    table = st.empty()
+
+    rows, forecasts, failed = [], {}, []
+    for done, (city, bundle) in enumerate(iter_weather_bundles(cities, units), start=1):
+        weather = bundle['weather']
+        label = f"{weather.name}, {weather.country}" if weather else city
+        if weather:
+            rows.append({
+                "City": label,
+                f"Temp ({temp_unit})": weather.temp,
+                f"Feels Like ({temp_unit})": weather.feels_like,
+                "Humidity (%)": weather.humidity,
+                f"Wind ({speed_unit})": weather.wind_speed,
+                "Conditions": weather.description.title(),
+            })
+            table.dataframe(pd.DataFrame(rows), hide_index=True, width="stretch")
+        if bundle['forecast']:
+            forecasts[label] = bundle['forecast']
+        if bundle['errors']:
+            failed.append(city)
+        progress.progress(done / len(cities), text=f"Loaded {done}/{len(cities)} cities")
+
+    if failed:
+        st.warning(f"Could not load: {', '.join(failed)}")
+
+    if forecasts:
+        with metrics.span('aggregate'):
+            daily = aggregate_daily(forecasts)
+        template = 'plotly_dark' if st.session_state.theme == 'dark' else 'plotly_white'
+        with metrics.span('figure_build', chart='city_comparison'):
+            fig = px.line(daily, x='date', y='max_temp', color='city', markers=True,
+                          labels={'max_temp': f'Daily High ({temp_unit})', 'date': '', 'city': 'City'},
+                          title='5-Day High Temperature by City', template=template)
+            fig.update_layout(hovermode='x unified', margin=dict(t=60, l=40, r=40, b=40))
+        with metrics.span('plotly_chart'):
+            st.plotly_chart(fig, width="stretch")
+
+def render_metrics_panel(spans):
+    """Sidebar breakdown of the stage timings recorded during this rerun.
+
+    ``spans`` comes from ``metrics.trace()`` and is ``None`` unless
+    instrumentation is enabled (``WEATHER_METRICS``), in which case nothing
+    is shown.
+    """
+    if spans is None:
+        return
+    totals = {}
+    for stage, seconds in spans:
+        calls, total = totals.get(stage, (0, 0.0))
+        totals[stage] = (calls + 1, total + seconds)
+    rows = "\n".join(f"| {stage} | {calls} | {total * 1e3:.1f} |" for stage, (calls, total) in totals.items())
+    with st.sidebar.expander("⏱️ Render timings"):
+        st.markdown("| Stage | Calls | ms |\n|---|---:|---:|\n" + rows)
+        st.caption("Last full page rerun. Upstream calls, JSON decoding and parsing recorded on fetch "
+                   "workers get their own rows and overlap 'fetch'; see the Prometheus export for histograms.")
+
 def main():
     setup_page_config()
     
@@ -274,31 +500,35 @@ def main():
     
     search_col, _ = st.columns([2, 1])
     with search_col:
-        location = st.text_input("Enter Location:", placeholder="Search city or coordinates...")
+        with st.form("location_search", border=False):
+            location = st.text_input("Enter Location:", placeholder="Search city or coordinates...")
+            st.form_submit_button("Search")
     
     if location:
         try:
-            weather_url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&units={units.lower()}&appid={config.OPENWEATHER_API_KEY}"
-            forecast_url = f"https://api.openweathermap.org/data/2.5/forecast?q={location}&units={units.lower()}&appid={config.OPENWEATHER_API_KEY}"
-            
-            weather_response = requests.get(weather_url)
-            forecast_response = requests.get(forecast_url)
-            
-            weather_data = weather_response.json()
-            forecast_data = forecast_response.json()
+            with metrics.span('fetch'):
+                bundle = run_search(
+                    'location', location, get_weather_bundle,
+                    keep=lambda bundle: not bundle['errors'] and not bundle['stale']
+                )
+            bundle = convert_bundle(bundle, units.lower())
+            errors = bundle['errors']
             
-            if weather_response.status_code != 200:
-                st.error(f"Weather error: {weather_data.get('message', 'Unknown error')}")
-            elif forecast_response.status_code != 200:
-                st.error(f"Forecast error: {forecast_data.get('message', 'Unknown error')}")
+            if 'weather' in errors:
+                st.error(f"Weather error: {str(errors['weather'])}")
+            elif 'forecast' in errors:
+                st.error(f"Forecast error: {str(errors['forecast'])}")
             else:
-                render_current_weather(weather_data, units.lower())
-                render_forecast(forecast_data, units.lower())
+                if bundle['stale']:
+                    st.warning("API quota reached — showing the most recently cached data.")
+                render_current_weather(bundle['weather'], units.lower())
+                render_forecast(bundle['forecast'], units.lower())
+                render_history(location, units.lower())
         except requests.exceptions.RequestException as e:
             st.error(f"Network error: {str(e)}")
     
     st.markdown("---")
-    render_map()
+    render_map(units.lower())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
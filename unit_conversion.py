@@ -0,0 +1,50 @@
+# unit_conversion.py
+"""Local conversion of metric weather data to other unit systems.
+
+Data is always fetched in metric; these helpers return converted copies of
+the parsed models (see ``weather_models``) and never mutate the (shared,
+cached) input.
+"""
+from dataclasses import replace
+
+import numpy as np
+
+MS_TO_MPH = 2.2369362920544
+
+
+def _celsius_to_fahrenheit(value):
+    return round(value * 9 / 5 + 32, 2)
+
+
+def _ms_to_mph(value):
+    return round(value * MS_TO_MPH, 2)
+
+
+def convert_weather(weather, unit_system):
+    """Convert metric ``CurrentWeather`` to ``unit_system``."""
+    if unit_system == 'metric':
+        return weather
+    return replace(
+        weather,
+        temp=_celsius_to_fahrenheit(weather.temp),
+        feels_like=_celsius_to_fahrenheit(weather.feels_like),
+        wind_speed=_ms_to_mph(weather.wind_speed),
+    )
+
+
+def convert_forecast(forecast, unit_system):
+    """Convert a metric ``Forecast`` to ``unit_system`` in one vectorized pass."""
+    if unit_system == 'metric':
+        return forecast
+    series = convert_series(forecast.series, unit_system)
+    series.flags.writeable = False
+    return replace(forecast, series=series)
+
+
+def convert_series(series, unit_system):
+    """Convert a structured array with ``temp``/``wind_speed`` fields (a copy)."""
+    series = series.copy()
+    if unit_system != 'metric':
+        series['temp'] = np.round(series['temp'] * 9 / 5 + 32, 2)
+        series['wind_speed'] = np.round(series['wind_speed'] * MS_TO_MPH, 2)
+    return series
@@ -0,0 +1,150 @@
+# weather_models.py
+"""Compact parsed forms of OpenWeather ``/weather`` and ``/forecast`` payloads.
+
+Responses are parsed as soon as they arrive and only the fields the app
+reads are kept: current conditions become a ``__slots__`` dataclass and a
+forecast becomes one NumPy structured array (``FORECAST_DTYPE``) plus a
+small table of distinct conditions. These objects are what the caches hold
+and what renderers and aggregation consume. ``dumps``/``loads`` give them a
+JSON form for the disk cache.
+
+orjson is used for decoding and encoding when it is installed.
+"""
+import json
+from dataclasses import dataclass, fields, is_dataclass, replace
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# One row per 3-hourly forecast step; ``condition`` indexes ``Forecast.conditions``
+FORECAST_DTYPE = np.dtype([
+    ('dt', np.int64),
+    ('temp', np.float64),
+    ('humidity', np.uint8),
+    ('wind_speed', np.float64),
+    ('condition', np.uint8),
+])
+
+
+@dataclass(frozen=True, slots=True)
+class CurrentWeather:
+    name: str
+    country: str
+    temp: float
+    feels_like: float
+    humidity: int
+    wind_speed: float
+    description: str
+    icon: str
+    dt: int
+    stale: bool = False
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Forecast:
+    city: str
+    series: np.ndarray
+    conditions: tuple  # ((description, icon), ...)
+    stale: bool = False
+
+
+def decode_json(data):
+    """Decode a JSON document (``bytes`` or ``str``)."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def encode_json(value):
+    """Encode JSON-compatible ``value`` as compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def parse_weather(payload):
+    """Parse a raw ``/weather`` response into ``CurrentWeather``."""
+    main = payload['main']
+    condition = payload['weather'][0]
+    return CurrentWeather(
+        name=payload.get('name', ''),
+        country=payload.get('sys', {}).get('country', ''),
+        temp=main['temp'],
+        feels_like=main['feels_like'],
+        humidity=main['humidity'],
+        wind_speed=payload['wind']['speed'],
+        description=condition['description'],
+        icon=condition['icon'],
+        dt=payload.get('dt', 0),
+    )
+
+
+def parse_forecast(payload):
+    """Parse a raw ``/forecast`` response into ``Forecast``."""
+    codes = {}
+    rows = []
+    for item in payload['list']:
+        condition = item['weather'][0]
+        code = codes.setdefault((condition['description'], condition['icon']), len(codes))
+        main = item['main']
+        rows.append((item['dt'], main['temp'], main['humidity'], item['wind']['speed'], code))
+    series = np.array(rows, dtype=FORECAST_DTYPE)
+    series.flags.writeable = False
+    return Forecast(city=payload.get('city', {}).get('name', ''), series=series, conditions=tuple(codes))
+
+
+def with_stale(value):
+    """Return ``value`` flagged as stale (models only; other values unchanged)."""
+    return replace(value, stale=True) if is_dataclass(value) else value
+
+
+def _to_plain(value):
+    if isinstance(value, CurrentWeather):
+        return {
+            '__model__': 'weather',
+            'fields': [getattr(value, field.name) for field in fields(value) if field.name != 'stale'],
+        }
+    if isinstance(value, Forecast):
+        return {
+            '__model__': 'forecast',
+            'city': value.city,
+            'conditions': [list(pair) for pair in value.conditions],
+            'series': {name: value.series[name].tolist() for name in FORECAST_DTYPE.names},
+        }
+    return value
+
+
+def _from_plain(value):
+    if not isinstance(value, dict):
+        return value
+    model = value.get('__model__')
+    if model == 'weather':
+        return CurrentWeather(*value['fields'])
+    if model == 'forecast':
+        columns = value['series']
+        series = np.empty(len(columns['dt']), dtype=FORECAST_DTYPE)
+        for name in FORECAST_DTYPE.names:
+            series[name] = columns[name]
+        series.flags.writeable = False
+        return Forecast(city=value['city'], series=series, conditions=tuple(map(tuple, value['conditions'])))
+    # Raw payloads written before responses were parsed
+    if 'list' in value:
+        return parse_forecast(value)
+    if 'main' in value:
+        return parse_weather(value)
+    return value
+
+
+def dumps(value):
+    """Serialize a model (or any JSON value) to text for the disk cache."""
+    plain = _to_plain(value)
+    if orjson is not None:
+        return orjson.dumps(plain).decode()
+    return json.dumps(plain, separators=(',', ':'))
+
+
+def loads(text):
+    """Inverse of ``dumps``; also accepts raw OpenWeather payloads."""
+    return _from_plain(decode_json(text))
@@ -1,46 +1,421 @@
 # weather_utils.py
-import requests
+import atexit
 import os
-from dotenv import load_dotenv
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import config
+import geohash
+import http_client
+import metrics
+from disk_cache import DiskCache
+import history_store
+from history_store import HistoryStore
+from refresh_scheduler import RefreshScheduler, last_update
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from unit_conversion import convert_forecast, convert_series, convert_weather
+import weather_models
 
-# Load environment variables
-if os.path.exists('.streamlit/secrets.toml'):
-    load_dotenv('.streamlit/secrets.toml')
+# Everything is fetched and cached in metric; other unit systems are derived
+# locally so switching units never triggers a network call.
+FETCH_UNIT_SYSTEM = 'metric'
 
-OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
+# Cache configuration (seconds). Forecasts are only regenerated upstream every
+# 3 hours, so they can be kept much longer than current conditions.
+WEATHER_CACHE_TTL = 600
+FORECAST_CACHE_TTL = 1800
+CACHE_STALE_TTL = 600
+CACHE_MAX_ENTRIES = 256
+GEOCODE_CACHE_TTL = 7 * 86400
 
-def get_weather_data(city, unit_system='metric'):
-    """Fetch current weather data for a given city."""
-    if not OPENWEATHER_API_KEY:
-        raise ValueError("API key is not set")
-    
-    base_url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {
-        'q': city,
-        'appid': OPENWEATHER_API_KEY,
-        'units': unit_system
-    }
-    
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        return response.json()
+# Coordinate lookups are quantized to geohash cells so nearby points share one
+# upstream result; precision 5 cells are roughly 5 km x 5 km.
+GEOHASH_PRECISION = 5
+
+# Persistent cache shared by all app processes on this host; set
+# WEATHER_CACHE_PATH to an empty string to keep caching in memory only.
+DISK_CACHE_PATH = os.getenv('WEATHER_CACHE_PATH', '.cache/openweather.sqlite3')
+DISK_CACHE_MAX_ENTRIES = 5000
+
+# Append-only history of every fetched forecast and observation, used for
+# trend charts; set WEATHER_HISTORY_PATH to an empty string to disable it.
+HISTORY_PATH = os.getenv('WEATHER_HISTORY_PATH', '.cache/history')
+
+# Upper bound on each pooled fetch once it is running (seconds)
+BUNDLE_TIMEOUT = 15
+
+# How long a pooled fetch may wait for a free worker before it is dropped
+# (seconds); a bundle takes at most this plus BUNDLE_TIMEOUT
+FETCH_QUEUE_TIMEOUT = 5
+
+# Concurrent upstream requests allowed per multi-city batch
+MULTI_CITY_WORKERS = 8
+
+# Background refresh of the most requested cities. Forecast model runs come
+# out every 3 hours (UTC); allow some publication lag before refetching.
+HOT_REFRESH_TOP_N = 20
+HOT_REFRESH_LEAD_TIME = 60
+FORECAST_UPDATE_INTERVAL = 3 * 3600
+FORECAST_UPDATE_DELAY = 15 * 60
+
+# Share of the API budget the refresher may use; 0 disables it
+HOT_REFRESH_BUDGET_SHARE = float(os.getenv('WEATHER_REFRESH_BUDGET_SHARE', 0.2))
+
+# Process-wide cache shared by every Streamlit session, backed by the disk cache
+_disk_cache = DiskCache(
+    DISK_CACHE_PATH, max_entries=DISK_CACHE_MAX_ENTRIES, dumps=weather_models.dumps, loads=weather_models.loads
+) if DISK_CACHE_PATH else None
+if _disk_cache is not None:
+    atexit.register(_disk_cache.close)
+_response_cache = ResponseCache(max_entries=CACHE_MAX_ENTRIES, stale_ttl=CACHE_STALE_TTL, backend=_disk_cache)
+
+# Collapses identical in-flight upstream requests across sessions
+_single_flight = SingleFlight()
+
+# Keeps popular cities warm so their users rarely wait on OpenWeather
+_refresh_scheduler = None
+if HOT_REFRESH_BUDGET_SHARE > 0:
+    _refresh_scheduler = RefreshScheduler(
+        _response_cache,
+        lambda key: _refresh_hot_key(*key),
+        ttls={'weather': WEATHER_CACHE_TTL, 'forecast': FORECAST_CACHE_TTL},
+        top_n=HOT_REFRESH_TOP_N,
+        lead_time=HOT_REFRESH_LEAD_TIME,
+        per_minute=max(1.0, http_client.CALLS_PER_MINUTE * HOT_REFRESH_BUDGET_SHARE),
+        per_day=max(1.0, http_client.CALLS_PER_DAY * HOT_REFRESH_BUDGET_SHARE),
+        aligned={'forecast': (FORECAST_UPDATE_INTERVAL, FORECAST_UPDATE_DELAY)},
+    )
+    atexit.register(_refresh_scheduler.close)
+
+_history = HistoryStore(HISTORY_PATH) if HISTORY_PATH else None
+
+# Appends run in order on one background thread, off the fetch path; pending
+# ones are finished at interpreter exit
+_history_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-writer") if _history else None
+
+# Responses are parsed into compact models before they are cached
+_PARSERS = {'weather': weather_models.parse_weather, 'forecast': weather_models.parse_forecast}
+
+# Worker pool shared by every session for side-by-side requests; sized to the
+# HTTP connection pool, which caps concurrent upstream requests anyway
+_fetch_executor = ThreadPoolExecutor(max_workers=http_client.POOL_SIZE, thread_name_prefix="weather-fetch")
+
+class UpstreamError(ValueError):
+    """OpenWeather answered with a non-200 status (kept in ``status_code``)."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+class QuotaExhausted(ValueError):
+    """The API budget is spent and nothing is cached for the request."""
+
+def normalize_city(city):
+    """Normalize a city query so equivalent spellings share a cache entry."""
+    return " ".join(city.split()).casefold()
+
+def unique_cities(cities):
+    """``cities`` without repeats under ``normalize_city``, first spelling kept."""
+    unique = {}
+    for city in cities:
+        unique.setdefault(normalize_city(city), city)
+    return list(unique.values())
+
+def get_cache_stats():
+    """Return hit/miss counters and current size of the response caches."""
+    stats = {**_response_cache.stats, 'size': len(_response_cache)}
+    if _disk_cache is not None:
+        stats['disk'] = {**_disk_cache.stats, 'size': len(_disk_cache)}
+    return stats
+
+def get_quota_stats():
+    """Return utilization of the shared OpenWeather API budget."""
+    return http_client.get_quota_stats()
+
+def get_coalescing_stats():
+    """Return how many upstream fetches ran and how many callers piggybacked."""
+    return dict(_single_flight.stats)
+
+def get_refresh_stats():
+    """Return background refresh counters (empty when the refresher is disabled)."""
+    return _refresh_scheduler.snapshot() if _refresh_scheduler is not None else {}
+
+def get_history_stats():
+    """Return history store counters (empty when history is disabled)."""
+    return dict(_history.stats) if _history is not None else {}
+
+def _fetch_openweather(endpoint, city):
+    """Fetch ``endpoint`` for ``city`` from OpenWeather in canonical units.
+
+    The response is parsed into its compact model right away and queued for
+    the history store. Concurrent requests for the same endpoint and
+    normalized city share a single upstream call.
+    """
+    key = (endpoint, normalize_city(city), FETCH_UNIT_SYSTEM)
+    params = {'q': city, 'units': FETCH_UNIT_SYSTEM}
+
+    def fetch():
+        model = _request_openweather(
+            f"data/2.5/{endpoint}", params, f"{endpoint} data for {city}", parse=_PARSERS[endpoint]
+        )
+        _record_history(endpoint, key[1], model)
+        return model
+
+    return _single_flight.do(key, fetch)
+
+def _record_history(endpoint, city, model):
+    """Queue a freshly fetched model for the history store.
+
+    OpenWeather does not report when a forecast was issued, so forecasts are
+    stamped with the latest model run published at fetch time; refetches of
+    the same run are then dropped as duplicates.
+    """
+    if _history is None:
+        return
+    if endpoint == 'forecast':
+        issued_at = last_update(time.time(), FORECAST_UPDATE_INTERVAL, FORECAST_UPDATE_DELAY)
+        _history_writer.submit(_append_history, city, 'forecast', history_store.forecast_rows(model, int(issued_at)))
     else:
-        raise ValueError(f"Could not fetch weather data for {city}: {response.status_code}")
+        _history_writer.submit(_append_history, city, 'observed', history_store.observation_rows(model))
 
-def get_forecast_data(city, unit_system='metric'):
-    """Fetch 5-day forecast data for a given city."""
-    if not OPENWEATHER_API_KEY:
-        raise ValueError("API key is not set")
-    
-    base_url = "https://api.openweathermap.org/data/2.5/forecast"
-    params = {
-        'q': city,
-        'appid': OPENWEATHER_API_KEY,
-        'units': unit_system
-    }
-    
-    response = requests.get(base_url, params=params)
+def _append_history(city, kind, rows):
+    with metrics.span('history_append'):
+        _history.append(city, kind, rows)
+
+def _request_openweather(path, params, description, parse=None):
+    base_url = f"{http_client.API_ROOT}/{path}"
+    params = {**params, 'appid': config.get_api_key()}
+
+    response = http_client.get(base_url, params=params)
     if response.status_code == 200:
-        return response.json()
+        with metrics.span('json_decode'):
+            payload = weather_models.decode_json(response.content)
+        if parse is None:
+            return payload
+        with metrics.span('parse'):
+            return parse(payload)
     else:
-        raise ValueError(f"Could not fetch forecast data for {city}: {response.status_code}")
\ No newline at end of file
+        raise UpstreamError(f"Could not fetch {description}: {response.status_code}", response.status_code)
+
+def _cached_fetch(key, fetch, ttl):
+    """Read through the response cache, degrading to stale data on quota exhaustion.
+
+    When the API budget is spent, the most recent cached payload for ``key``
+    is returned instead; parsed models are copied and flagged ``stale``.
+    """
+    try:
+        return _response_cache.get_or_fetch(key, fetch, ttl)
+    except http_client.RateLimitExceeded:
+        payload = _response_cache.peek(key)
+        if payload is None:
+            raise QuotaExhausted("OpenWeather API quota exhausted and no cached data is available; please try again shortly")
+        return weather_models.with_stale(payload)
+
+def _collect_metrics():
+    """Cache, upstream and quota counters for the Prometheus export."""
+    samples = [('weather_cache_events_total', {'event': event}, count)
+               for event, count in _response_cache.stats.items()]
+    samples.append(('weather_cache_entries', {}, len(_response_cache)))
+    if _disk_cache is not None:
+        samples += [('weather_disk_cache_events_total', {'event': event}, count)
+                    for event, count in _disk_cache.stats.items()]
+    for endpoint, stats in http_client.get_latency_stats().items():
+        for field in ('calls', 'errors', 'retries'):
+            samples.append((f'weather_upstream_{field}_total', {'endpoint': endpoint}, stats[field]))
+    samples += [(f'weather_single_flight_{field}_total', {}, count) for field, count in _single_flight.stats.items()]
+    for bucket, snapshot in http_client.get_quota_stats().items():
+        samples.append(('weather_quota_utilization', {'bucket': bucket}, round(snapshot['utilization'], 4)))
+        samples.append(('weather_quota_rejected_total', {'bucket': bucket}, snapshot['rejected']))
+    samples += [(f'weather_history_{field}_total', {}, count) for field, count in get_history_stats().items()]
+    samples += [(f'weather_refresh_{field}_total', {}, value) for field, value in get_refresh_stats().items()
+                if field not in ('tracked', 'hot')]
+    return samples
+
+metrics.register_collector(_collect_metrics)
+
+def _refresh_hot_key(endpoint, city):
+    """Refetch a popular city's cached payload ahead of its expiry."""
+    ttl = WEATHER_CACHE_TTL if endpoint == 'weather' else FORECAST_CACHE_TTL
+    _response_cache.put((endpoint, city), _fetch_openweather(endpoint, city), ttl)
+
+def _record_access(key):
+    if _refresh_scheduler is not None:
+        _refresh_scheduler.record(key)
+
+def get_weather_data(city, unit_system='metric'):
+    """Fetch current weather for a given city as ``CurrentWeather``."""
+    key = ('weather', normalize_city(city))
+    _record_access(key)
+    payload = _cached_fetch(key, lambda: _fetch_openweather('weather', city), WEATHER_CACHE_TTL)
+    return convert_weather(payload, unit_system)
+
+def get_forecast_data(city, unit_system='metric'):
+    """Fetch the 5-day forecast for a given city as a ``Forecast``."""
+    key = ('forecast', normalize_city(city))
+    _record_access(key)
+    payload = _cached_fetch(key, lambda: _fetch_openweather('forecast', city), FORECAST_CACHE_TTL)
+    return convert_forecast(payload, unit_system)
+
+def get_history(city, start, end, unit_system='metric'):
+    """Return stored ``observed`` and ``forecast`` rows for ``city`` with ``start <= dt < end``.
+
+    Rows are ``history_store.HISTORY_DTYPE`` arrays sorted by ``(dt, issued_at)``
+    and read from local storage only; both are empty when history is disabled.
+    """
+    if _history is None:
+        return {kind: history_store.empty_rows() for kind in history_store.KINDS}
+    city = normalize_city(city)
+    with metrics.span('history_query'):
+        return {
+            kind: convert_series(_history.query(city, kind, start, end), unit_system)
+            for kind in history_store.KINDS
+        }
+
+def geocode_location(query, limit=5):
+    """Resolve a free-text location to up to ``limit`` candidate places."""
+    key = ('geocode', normalize_city(query), limit)
+    params = {'q': query, 'limit': limit}
+    fetch = lambda: _single_flight.do(
+        key, lambda: _request_openweather("geo/1.0/direct", params, f"locations for {query}")
+    )
+    return _cached_fetch(key, fetch, GEOCODE_CACHE_TTL)
+
+def get_weather_by_coords(lat, lon, unit_system='metric', precision=GEOHASH_PRECISION):
+    """Fetch current weather for the geohash cell containing (lat, lon).
+
+    All points in the same cell share one cache entry and one upstream call,
+    made for the cell centre.
+    """
+    cell = geohash.encode(lat, lon, precision)
+    key = ('weather', f"geohash:{cell}")
+    center_lat, center_lon = geohash.decode(cell)
+    params = {'lat': round(center_lat, 4), 'lon': round(center_lon, 4), 'units': FETCH_UNIT_SYSTEM}
+    fetch = lambda: _single_flight.do(
+        key, lambda: _request_openweather(
+            "data/2.5/weather", params, f"weather data near {lat:.4f}, {lon:.4f}", parse=weather_models.parse_weather
+        )
+    )
+    payload = _cached_fetch(key, fetch, WEATHER_CACHE_TTL)
+    return convert_weather(payload, unit_system)
+
+def _run_pooled(calls, timeout):
+    """Run ``(function, *args)`` calls on the fetch pool and wait for them.
+
+    Each call gets up to ``timeout`` seconds once a worker picks it up.
+    Calls still queued ``FETCH_QUEUE_TIMEOUT`` seconds after submission are
+    cancelled, so a pool busy with other sessions' requests delays results
+    by a bounded amount. Returns the futures in call order; calls that
+    overran keep running and still fill the cache. Spans join the caller's
+    trace.
+    """
+    submitted = []
+    for function, *args in calls:
+        started = Future()
+
+        def run(function=function, args=args, started=started):
+            started.set_result(time.monotonic())
+            return function(*args)
+
+        submitted.append((_fetch_executor.submit(metrics.traced(run)), started))
+
+    queue_deadline = time.monotonic() + FETCH_QUEUE_TIMEOUT
+    for future, started in submitted:
+        try:
+            began = started.result(timeout=max(0.0, queue_deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            continue
+        wait([future], timeout=max(0.0, began + timeout - time.monotonic()))
+    return [future for future, _ in submitted]
+
+def get_weather_for_locations(locations, unit_system='metric', timeout=BUNDLE_TIMEOUT):
+    """Fetch current weather for many ``{'lat', 'lon'}`` places concurrently.
+
+    Returns a list aligned with ``locations``; entries whose lookup failed or
+    timed out are ``None``. Places in the same geohash cell share one request.
+    """
+    futures = _run_pooled(
+        [(get_weather_by_coords, loc['lat'], loc['lon'], unit_system) for loc in locations], timeout
+    )
+
+    results = []
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            results.append(future.result())
+        else:
+            results.append(None)
+    return results
+
+def get_weather_bundle(city, unit_system='metric', timeout=BUNDLE_TIMEOUT):
+    """Fetch current weather and forecast for a city concurrently.
+
+    Returns a dict with ``weather`` and ``forecast`` models (``None`` when a
+    request failed), an ``errors`` dict mapping the failed part to its
+    exception and a ``stale`` flag set when quota limits forced a fallback
+    to older cached data. Each request may run for ``timeout`` seconds
+    after waiting at most ``FETCH_QUEUE_TIMEOUT`` for a worker.
+    """
+    futures = dict(zip(('weather', 'forecast'), _run_pooled(
+        [(get_weather_data, city, unit_system), (get_forecast_data, city, unit_system)], timeout
+    )))
+
+    bundle = {'weather': None, 'forecast': None, 'errors': {}}
+    for part, future in futures.items():
+        if future.cancelled():
+            bundle['errors'][part] = TimeoutError(f"Timed out waiting to fetch {part} data for {city}; the server is busy")
+        elif not future.done():
+            bundle['errors'][part] = TimeoutError(f"Timed out fetching {part} data for {city}")
+        elif future.exception() is not None:
+            bundle['errors'][part] = future.exception()
+        else:
+            bundle[part] = future.result()
+    bundle['stale'] = _is_stale(bundle)
+    return bundle
+
+def convert_bundle(bundle, unit_system):
+    """Copy of a metric ``get_weather_bundle`` result converted to ``unit_system`` locally."""
+    if unit_system == FETCH_UNIT_SYSTEM:
+        return bundle
+    converted = dict(bundle)
+    if bundle['weather'] is not None:
+        converted['weather'] = convert_weather(bundle['weather'], unit_system)
+    if bundle['forecast'] is not None:
+        converted['forecast'] = convert_forecast(bundle['forecast'], unit_system)
+    return converted
+
+def _is_stale(bundle):
+    return any(bundle[part] is not None and bundle[part].stale for part in ('weather', 'forecast'))
+
+def iter_weather_bundles(cities, unit_system='metric', max_workers=MULTI_CITY_WORKERS):
+    """Fetch current weather and forecast for many cities, yielding as they complete.
+
+    At most ``max_workers`` upstream requests run at once. Yields
+    ``(city, bundle)`` pairs (same shape as ``get_weather_bundle``) in
+    completion order, so callers can render each city as soon as it arrives.
+    Duplicate cities (after normalization) are fetched once.
+    """
+    cities = unique_cities(cities)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="multi-city")
+    try:
+        futures = {}
+        for city in cities:
+            futures[executor.submit(get_weather_data, city, unit_system)] = (city, 'weather')
+            futures[executor.submit(get_forecast_data, city, unit_system)] = (city, 'forecast')
+
+        pending = {city: {'weather': None, 'forecast': None, 'errors': {}} for city in cities}
+        remaining = {city: 2 for city in cities}
+        for future in as_completed(futures):
+            city, part = futures[future]
+            bundle = pending[city]
+            if future.exception() is not None:
+                bundle['errors'][part] = future.exception()
+            else:
+                bundle[part] = future.result()
+            remaining[city] -= 1
+            if remaining[city] == 0:
+                bundle['stale'] = _is_stale(bundle)
+                yield city, pending.pop(city)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)